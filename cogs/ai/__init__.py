@@ -15,7 +15,7 @@ from .tools import ADMIN_TOOLS, BOT_MANAGEMENT_TOOLS, CUSTOM_TOOLS
 from .tools.memory import fetch_user_memory_context
 from .history import build_chat_history
 from .chat_handler import ChatHandler
-from db.repositories.ai_whitelist import add_to_whitelist, load_whitelist, remove_from_whitelist
+from database import db
 
 logger = logging.getLogger(__name__)
 
@@ -45,7 +45,7 @@ class AICog(commands.Cog):
     async def on_ready(self):
         """Load the persistent whitelist from DB once the bot is ready."""
         try:
-            self.execute_code_whitelist = await load_whitelist()
+            self.execute_code_whitelist = await db.load_ai_whitelist()
             logger.info(f"AI whitelist loaded: {self.execute_code_whitelist}")
         except Exception as e:
             logger.error(f"Failed to load AI whitelist: {e}")
@@ -251,8 +251,10 @@ class AICog(commands.Cog):
             return await ctx.send("❌ Provide a guild ID.")
         if gid in self.execute_code_whitelist:
             return await ctx.send(f"⚠️ `{gid}` already whitelisted.")
+        added = await db.add_to_ai_whitelist(gid)
         self.execute_code_whitelist.add(gid)
-        await add_to_whitelist(gid)
+        if not added:
+            return await ctx.send(f"⚠️ `{gid}` already whitelisted.")
         await ctx.send(f"✅ Whitelisted `{gid}`.")
 
     @commands.command(name='unwhitelist_code')
@@ -262,8 +264,8 @@ class AICog(commands.Cog):
         gid = guild_id or (ctx.guild.id if ctx.guild else None)
         if not gid or gid not in self.execute_code_whitelist:
             return await ctx.send("❌ Not whitelisted.")
-        self.execute_code_whitelist.remove(gid)
-        await remove_from_whitelist(gid)
+        self.execute_code_whitelist.discard(gid)
+        await db.remove_from_ai_whitelist(gid)
         await ctx.send(f"✅ Removed `{gid}`.")
 
     @commands.command(name='list_whitelisted')
@@ -225,10 +225,10 @@ async def send_campaign(
     
     if not guild_id or not guild:
         return "❌ Error: This tool can only be used in a server."
-    campaign = await db.campaigns.get_campaign(campaign_id, guild_id)
+    campaign = await db.campaigns.get_campaign_with_forms(campaign_id, guild_id)
     if not campaign:
         return "❌ Error: Campaign not found or doesn't belong to this server."
-    buttons = await db.campaigns.get_campaign_forms(campaign_id)
+    buttons = campaign['forms']
     content = campaign.get('message_content') or ""
     if campaign.get('embed_title'):
         content = f"**{campaign.get('embed_title')}**\n{content}"
@@ -377,14 +377,20 @@ async def get_campaign_responses(campaign_id: int, **kwargs):
         return "❌ Error: This tool can only be used in a server."
     
     try:
-        responses = await db.campaigns.get_responses(campaign_id=campaign_id, guild_id=guild_id)
+        responses = []
+        async for response in db.campaigns.iter_responses(campaign_id=campaign_id, guild_id=guild_id, page_size=20):
+            responses.append(response)
+            if len(responses) == 20:
+                break
         
         if not responses:
             return "No responses found for this campaign."
         
-        result = f"**Campaign Responses ({len(responses)} total):**\n\n"
+        # Responses exist for this guild, so the campaign is this guild's and its count can be used directly.
+        total = await db.campaigns.get_response_count(campaign_id)
+        result = f"**Campaign Responses ({total} total):**\n\n"
         
-        for i, response in enumerate(responses[:20], 1):  # Limit to 20
+        for i, response in enumerate(responses, 1):  # Limit to 20
             user = guild.get_member(response['user_id']) if guild else None
             user_name = user.name if user else f"User {response['user_id']}"
             
@@ -393,8 +399,8 @@ async def get_campaign_responses(campaign_id: int, **kwargs):
             
             result += f"{i}. **{user_name}**\n{response_text}\n\n"
         
-        if len(responses) > 20:
-            result += f"... and {len(responses) - 20} more responses"
+        if total > 20:
+            result += f"... and {total - 20} more responses"
         
         return result
     
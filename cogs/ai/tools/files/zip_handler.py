@@ -9,6 +9,8 @@ import zipfile
 from pathlib import Path
 from typing import List, Tuple
 
+from utils.formatting import format_size
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,7 +68,7 @@ def _check_safety_sync(file_path: str, depth: int = 0) -> Tuple[bool, str]:
             compressed_size = os.path.getsize(file_path)
             total_uncompressed = sum(info.file_size for info in infos)
             if total_uncompressed > MAX_TOTAL_EXTRACTED_SIZE:
-                return False, f"Total size too large ({_format_size(total_uncompressed)} > {_format_size(MAX_TOTAL_EXTRACTED_SIZE)})"
+                return False, f"Total size too large ({format_size(total_uncompressed)} > {format_size(MAX_TOTAL_EXTRACTED_SIZE)})"
             if compressed_size > 0:
                 ratio = total_uncompressed / compressed_size
                 if ratio > MAX_COMPRESSION_RATIO:
@@ -76,7 +78,7 @@ def _check_safety_sync(file_path: str, depth: int = 0) -> Tuple[bool, str]:
                 if len(nested_zips) > 10:
                     return False, f"Too many nested ZIP files ({len(nested_zips)})"
             
-            return True, f"Safe: {len(infos)} files, {_format_size(total_uncompressed)} uncompressed"
+            return True, f"Safe: {len(infos)} files, {format_size(total_uncompressed)} uncompressed"
             
     except zipfile.BadZipFile:
         return False, "Corrupted or invalid ZIP file"
@@ -232,12 +234,3 @@ def _list_contents_sync(file_path: str) -> List[dict]:
             })
     
     return contents
-
-
-def _format_size(size_bytes: int) -> str:
-    """Format bytes as human-readable string."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f} TB"
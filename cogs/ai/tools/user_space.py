@@ -13,6 +13,7 @@ import aiofiles
 import aiohttp
 
 from database import Database
+from utils.formatting import format_size
 
 from .files import (
     ZipSafetyError,
@@ -44,10 +45,37 @@ def _sanitize_filename(filename: str) -> str:
 
 
 async def _get_file_repo():
-    """Get the file storage repository."""
-    from db.repositories.file_storage import FileStorageRepository
-    db = Database()
-    return FileStorageRepository(db.connection)
+    """Get the shared file storage repository (it caches per-user usage)."""
+    return Database().file_storage
+
+
+def _staging_path(user_id: int, filename: str) -> Path:
+    """Where new bytes for `filename` are written before their record is added."""
+    return _get_user_dir(user_id) / f".temp_{filename}"
+
+
+async def _record_file(repo, file_path: Path, staged_path: Optional[Path] = None, **fields) -> bool:
+    """
+    Add the record for a file written to disk. Bytes that may replace an existing file
+    are written to `staged_path` and only moved over `file_path` once add_file succeeds.
+    When add_file rejects it (another upload used the remaining quota, or the write
+    failed) the new file is deleted so it isn't left on disk untracked, unless it was
+    written in place over a file whose surviving record still points there.
+    Returns whether the file was kept.
+    """
+    if await repo.add_file(file_path=str(file_path), **fields) is not None:
+        if staged_path is not None:
+            os.replace(staged_path, file_path)
+        return True
+    if staged_path is not None:
+        staged_path.unlink(missing_ok=True)
+    elif await repo.get_file(fields['user_id'], fields['filename']) is None:
+        file_path.unlink(missing_ok=True)
+    return False
+
+
+def _not_saved(filename: str) -> str:
+    return f"❌ Could not save `{filename}`: storage quota reached or the file record failed."
 
 
 async def save_to_space(
@@ -111,14 +139,15 @@ async def save_to_space(
             os.remove(file_path)
             return f"❌ {reason}"
         mime_type = mimetypes.guess_type(filename)[0] or 'text/plain'
-        await repo.add_file(
+        if not await _record_file(
+            repo, file_path,
             user_id=user_id,
             filename=filename,
             original_filename=filename,
-            file_path=str(file_path),
             file_size=file_size,
             mime_type=mime_type
-        )
+        ):
+            return _not_saved(filename)
         usage = await repo.get_storage_usage(user_id)
         action = "Overwrote" if overwriting else "Saved"
         content_preview = content[:100].replace('\n', ' ').strip()
@@ -126,9 +155,9 @@ async def save_to_space(
             content_preview += "..."
         
         response = f"✅ **{action}:** `{filename}`\n"
-        response += f"📄 **Type:** {actual_type.upper()} | **Size:** {_format_size(file_size)}\n"
+        response += f"📄 **Type:** {actual_type.upper()} | **Size:** {format_size(file_size)}\n"
         response += f"� **Preview:** `{content_preview}`\n"
-        response += f"📁 **Storage:** {usage['usage_percent']:.1f}% used ({_format_size(usage['total_bytes_used'])} / {_format_size(usage['max_storage'])})"
+        response += f"📁 **Storage:** {usage['usage_percent']:.1f}% used ({format_size(usage['total_bytes_used'])} / {format_size(usage['max_storage'])})"
         
         return response
         
@@ -175,37 +204,30 @@ async def upload_attachment_to_space(
         can_upload, reason = await repo.can_upload(user_id, file_size)
         if not can_upload:
             return f"❌ {reason}"
+        # Written beside the final path so a rejected record can't clobber an existing file
+        temp_path = _staging_path(user_id, filename)
+        async with aiofiles.open(temp_path, 'wb') as f:
+            await f.write(file_data)
         if filename.lower().endswith('.zip'):
-            temp_path = _get_user_dir(user_id) / f".temp_{filename}"
-            async with aiofiles.open(temp_path, 'wb') as f:
-                await f.write(file_data)
-            
             is_safe, safety_msg = await check_zip_safety(str(temp_path))
             if not is_safe:
                 os.remove(temp_path)
                 return f"❌ **ZIP Safety Check Failed:** {safety_msg}"
-            file_path = _get_user_dir(user_id) / filename
-            os.rename(temp_path, file_path)
-        else:
-            file_path = _get_user_dir(user_id) / filename
-            async with aiofiles.open(file_path, 'wb') as f:
-                await f.write(file_data)
-        existing = await repo.get_file(user_id, filename)
-        if existing:
-            await repo.delete_file(user_id, filename)
+        file_path = _get_user_dir(user_id) / filename
         mime_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-        await repo.add_file(
+        if not await _record_file(
+            repo, file_path, temp_path,
             user_id=user_id,
             filename=filename,
             original_filename=filename,
-            file_path=str(file_path),
             file_size=file_size,
             mime_type=mime_type
-        )
+        ):
+            return _not_saved(filename)
         
         usage = await repo.get_storage_usage(user_id)
         
-        return f"✅ **Uploaded:** `{filename}` ({_format_size(file_size)})\n📁 Space used: {usage['usage_percent']:.1f}%"
+        return f"✅ **Uploaded:** `{filename}` ({format_size(file_size)})\n📁 Space used: {usage['usage_percent']:.1f}%"
         
     except Exception as e:
         logger.error(f"Failed to upload attachment: {e}")
@@ -285,24 +307,27 @@ async def read_from_space(filename: str, extract_images: bool = False, **kwargs)
                 
                 if "error" in result:
                     return f"❌ Error reading PDF: {result['error']}"
+                saved_images = []
                 for img in result.get('images', []):
                     img_path = Path(img['path'])
-                    if img_path.exists():
-                        await repo.add_file(
-                            user_id=user_id,
-                            filename=img['filename'],
-                            original_filename=img['filename'],
-                            file_path=img['path'],
-                            file_size=img['size_bytes'],
-                            mime_type=f"image/{img['path'].split('.')[-1]}"
-                        )
+                    if img_path.exists() and await _record_file(
+                        repo, img_path,
+                        user_id=user_id,
+                        filename=img['filename'],
+                        original_filename=img['filename'],
+                        file_size=img['size_bytes'],
+                        mime_type=f"image/{img['path'].split('.')[-1]}"
+                    ):
+                        saved_images.append(img)
                 
                 content = result['text']
                 img_count = result.get('image_count', 0)
                 header = f"📄 **Contents of `{filename}` (with {img_count} images):**\n\n"
                 
-                if img_count > 0:
-                    header += f"💡 Images extracted: use `analyze_image` on filenames like `{result['images'][0]['filename']}`\n\n"
+                if saved_images:
+                    header += f"💡 Images extracted: use `analyze_image` on filenames like `{saved_images[0]['filename']}`\n\n"
+                if len(saved_images) < img_count:
+                    header += f"⚠️ {img_count - len(saved_images)} image(s) could not be saved (storage quota reached).\n\n"
                 
                 return header + content
             else:
@@ -320,13 +345,13 @@ async def read_from_space(filename: str, extract_images: bool = False, **kwargs)
         elif ext == '.zip':
             from .files.zip_handler import list_zip_contents
             contents = await list_zip_contents(str(file_path))
-            file_list = "\n".join([f"  - {c['filename']} ({_format_size(c['size'])})" for c in contents[:20]])
+            file_list = "\n".join([f"  - {c['filename']} ({format_size(c['size'])})" for c in contents[:20]])
             if len(contents) > 20:
                 file_list += f"\n  ... and {len(contents) - 20} more files"
             return f"📦 **ZIP Contents of `{filename}`:**\n{file_list}"
         
         else:
-            return f"📁 **File:** `{filename}`\nType: {file_info.get('mime_type', 'unknown')}\nSize: {_format_size(file_info['file_size'])}\n\n(Cannot display binary file contents)"
+            return f"📁 **File:** `{filename}`\nType: {file_info.get('mime_type', 'unknown')}\nSize: {format_size(file_info['file_size'])}\n\n(Cannot display binary file contents)"
             
     except Exception as e:
         logger.error(f"Failed to read file: {e}")
@@ -376,23 +401,27 @@ async def extract_pdf_images(filename: str, **kwargs) -> str:
         
         if "error" in images[0]:
             return f"❌ Error extracting images: {images[0]['error']}"
+        saved_images = []
         for img in images:
             img_path = Path(img['path'])
             if img_path.exists():
                 size = img_path.stat().st_size
                 mime_type = f"image/{img.get('path', '').split('.')[-1]}"
                 
-                await repo.add_file(
+                if await _record_file(
+                    repo, img_path,
                     user_id=user_id,
                     filename=img['filename'],
                     original_filename=img['filename'],
-                    file_path=img['path'],
                     file_size=size,
                     mime_type=mime_type
-                )
-        result = f"🖼️ **Extracted {len(images)} images from `{filename}`:**\n\n"
-        for img in images:
+                ):
+                    saved_images.append(img)
+        result = f"🖼️ **Extracted {len(saved_images)} images from `{filename}`:**\n\n"
+        for img in saved_images:
             result += f"• `{img['filename']}` (Page {img['page']}, {img['width']}×{img['height']})\n"
+        if len(saved_images) < len(images):
+            result += f"\n⚠️ {len(images) - len(saved_images)} image(s) could not be saved (storage quota reached).\n"
         
         result += "\n💡 **Tip:** Use `analyze_image` or `read_from_space` on these images to read their contents."
         
@@ -418,22 +447,21 @@ async def list_space(**kwargs) -> str:
     try:
         repo = await _get_file_repo()
         
-        files = await repo.list_files(user_id)
+        file_list = []
+        newest_filename = None
+        async for f in repo.iter_files(user_id):
+            newest_filename = newest_filename or f['filename']
+            size_str = format_size(f['file_size'])
+            file_list.append(f"• `{f['filename']}` - {size_str}")
         
-        if not files:
+        if not file_list:
             return "📂 **Your Space is Empty**\nUpload files by sending them to me, or use `save_to_space()` to save generated content."
-        if files:
-            await repo.update_last_accessed(user_id, files[0]['filename'])
+        await repo.update_last_accessed(user_id, newest_filename)
         
         usage = await repo.get_storage_usage(user_id)
         
-        file_list = []
-        for f in files:
-            size_str = _format_size(f['file_size'])
-            file_list.append(f"• `{f['filename']}` - {size_str}")
-        
-        header = f"📂 **Your Files** ({len(files)} files, {usage['usage_percent']:.1f}% used)\n"
-        header += f"Storage: {_format_size(usage['total_bytes_used'])} / {_format_size(usage['max_storage'])}\n\n"
+        header = f"📂 **Your Files** ({len(file_list)} files, {usage['usage_percent']:.1f}% used)\n"
+        header += f"Storage: {format_size(usage['total_bytes_used'])} / {format_size(usage['max_storage'])}\n\n"
         
         return header + "\n".join(file_list)
         
@@ -459,10 +487,10 @@ async def get_space_info(**kwargs) -> str:
         
         return f"""📊 **Storage Info**
         
-**Used:** {_format_size(usage['total_bytes_used'])} / {_format_size(usage['max_storage'])} ({usage['usage_percent']:.1f}%)
-**Remaining:** {_format_size(usage['bytes_remaining'])}
+**Used:** {format_size(usage['total_bytes_used'])} / {format_size(usage['max_storage'])} ({usage['usage_percent']:.1f}%)
+**Remaining:** {format_size(usage['bytes_remaining'])}
 **File Count:** {usage['file_count']}
-**Max File Size:** {_format_size(usage['max_file_size'])}"""
+**Max File Size:** {format_size(usage['max_file_size'])}"""
         
     except Exception as e:
         logger.error(f"Failed to get space info: {e}")
@@ -500,7 +528,7 @@ async def delete_from_space(filename: str, **kwargs) -> str:
         if file_path.exists():
             os.remove(file_path)
         
-        return f"🗑️ **Deleted:** `{filename}` ({_format_size(file_size)} freed)"
+        return f"🗑️ **Deleted:** `{filename}` ({format_size(file_size)} freed)"
         
     except Exception as e:
         logger.error(f"Failed to delete file: {e}")
@@ -543,24 +571,28 @@ async def zip_files(filenames: str, output_name: str, **kwargs) -> str:
             output_name = f"{output_name}.zip"
         
         output_path = user_dir / output_name
-        result = await create_zip(files_to_zip, str(output_path), str(user_dir))
+        # Built beside the final path; an existing zip of that name is replaced only once recorded
+        temp_path = _staging_path(user_id, output_name)
+        result = await create_zip(files_to_zip, str(temp_path), str(user_dir))
         if result.startswith("Error"):
+            temp_path.unlink(missing_ok=True)
             return f"❌ {result}"
-        zip_size = output_path.stat().st_size
+        zip_size = temp_path.stat().st_size
         can_upload, reason = await repo.can_upload(user_id, zip_size)
         if not can_upload:
-            os.remove(output_path)
+            os.remove(temp_path)
             return f"❌ {reason}"
-        await repo.add_file(
+        if not await _record_file(
+            repo, output_path, temp_path,
             user_id=user_id,
             filename=output_name,
             original_filename=output_name,
-            file_path=str(output_path),
             file_size=zip_size,
             mime_type='application/zip'
-        )
+        ):
+            return _not_saved(output_name)
         
-        return f"✅ **Created:** `{output_name}` ({_format_size(zip_size)})\nContains {len(files_to_zip)} files."
+        return f"✅ **Created:** `{output_name}` ({format_size(zip_size)})\nContains {len(files_to_zip)} files."
         
     except Exception as e:
         logger.error(f"Failed to create ZIP: {e}")
@@ -626,15 +658,15 @@ async def unzip_file(filename: str, **kwargs) -> str:
             can_upload, reason = await repo.can_upload(user_id, file_size)
             if can_upload:
                 mime_type = mimetypes.guess_type(new_filename)[0] or 'application/octet-stream'
-                await repo.add_file(
+                if await _record_file(
+                    repo, new_path,
                     user_id=user_id,
                     filename=new_filename,
                     original_filename=extracted_path.name,
-                    file_path=str(new_path),
                     file_size=file_size,
                     mime_type=mime_type
-                )
-                added_files.append(new_filename)
+                ):
+                    added_files.append(new_filename)
             else:
                 os.remove(new_path)
         if extract_dir.exists():
@@ -720,14 +752,6 @@ async def share_file(filename: str, **kwargs) -> str:
         logger.error(f"Failed to share file: {e}")
         return f"❌ Error sharing file: {e}"
 
-def _format_size(size_bytes: int) -> str:
-    """Format bytes as human-readable string."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024:
-            return f"{size_bytes:.1f} {unit}"
-        size_bytes /= 1024
-    return f"{size_bytes:.1f} TB"
-
 USER_SPACE_TOOLS = [
     save_to_space,
     upload_attachment_to_space,
@@ -4,6 +4,15 @@ import nextcord as discord
 
 import inspect
 
+# Names the proxy resolves on itself rather than forwarding to the wrapped object
+_PROXY_OWN_NAMES = frozenset({"_obj", "_forbidden", "__getattribute__", "__getattr__", "__repr__", "__dir__"})
+
+# Bot attributes that would reach beyond the scoped guild or control the connection
+SCOPED_BOT_FORBIDDEN = frozenset({
+    'guilds', 'users', 'voice_clients', 'dm_channels', 'private_channels', 'http', 'close', 'logout', 'ws'
+})
+
+
 class SecureProxy:
     """
     A recursive structural proxy that blocks all internal/private attribute access.
@@ -11,11 +20,11 @@ class SecureProxy:
     """
     def __init__(self, obj, forbidden_names=None):
         object.__setattr__(self, "_obj", obj)
-        object.__setattr__(self, "_forbidden", forbidden_names or set())
+        object.__setattr__(self, "_forbidden", frozenset(forbidden_names or ()))
 
     def __getattribute__(self, name):
         # Allow internal access to the wrapped object for the proxy itself
-        if name in ("_obj", "_forbidden", "__getattribute__", "__getattr__", "__repr__", "__dir__"):
+        if name in _PROXY_OWN_NAMES:
              return object.__getattribute__(self, name)
              
         # STRUCTURAL BLOCK: No underscores allowed, no forbidden names
@@ -59,8 +68,7 @@ class SecureProxy:
 class ScopedBot(SecureProxy):
     """A structurally secured wrapper around the bot instance restricted to one guild."""
     def __init__(self, bot, guild_id):
-        forbidden = {'guilds', 'users', 'voice_clients', 'dm_channels', 'private_channels', 'http', 'close', 'logout', 'ws'}
-        super().__init__(bot, forbidden_names=forbidden)
+        super().__init__(bot, forbidden_names=SCOPED_BOT_FORBIDDEN)
         object.__setattr__(self, "_guild_id", guild_id)
 
     def get_guild(self, guild_id):
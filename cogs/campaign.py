@@ -1,5 +1,4 @@
 """Campaign management cog for mass messaging"""
-import json
 from typing import Optional
 
 import nextcord as discord
@@ -141,11 +140,7 @@ class CampaignCog(commands.Cog):
             for match in user_matches:
                 user_id = int(match[0] or match[1])
                 user_ids.append(user_id)
-        role_ids_json = json.dumps(role_ids) if role_ids else None
-        user_ids_json = json.dumps(user_ids) if user_ids else None
-        
-        query = "UPDATE campaigns SET target_role_ids = ?, target_user_ids = ? WHERE id = ?"
-        await db.connection.execute_write(query, (role_ids_json, user_ids_json, campaign_id))
+        await db.campaigns.set_targets(campaign_id, role_ids, user_ids)
         
         embed = discord.Embed(
             title="✅ Targets Updated",
@@ -268,18 +263,11 @@ class CampaignCog(commands.Cog):
                 'required': True,
                 'multiline': False
             })
-        form_fields_json = json.dumps(form_fields)
-        query = """
-            UPDATE campaign_forms 
-            SET has_form = 1, modal_title = ?, form_fields = ?, response_channel_id = ?
-            WHERE id = ?
-        """
-        await db.connection.execute_write(
-            query,
-            (modal_title,
-            form_fields_json,
-            response_channel.id if response_channel else None,
-            form_id)
+        await db.campaigns.set_form_fields(
+            form_id,
+            modal_title,
+            form_fields,
+            response_channel.id if response_channel else None
         )
         
         embed = discord.Embed(
@@ -319,11 +307,11 @@ class CampaignCog(commands.Cog):
         """Preview what the campaign will look like"""
         await interaction.response.defer(ephemeral=True)
         
-        campaign = await db.campaigns.get_campaign(campaign_id, interaction.guild_id)
+        campaign = await db.campaigns.get_campaign_with_forms(campaign_id, interaction.guild_id)
         if not campaign:
             await interaction.followup.send("❌ Campaign not found.", ephemeral=True)
             return
-        buttons = await db.campaigns.get_campaign_forms(campaign_id)
+        buttons = campaign['forms']
         content = campaign.get('message_content')
         embed = None
         
@@ -367,11 +355,11 @@ class CampaignCog(commands.Cog):
         """Send a campaign to DMs or a channel"""
         await interaction.response.defer(ephemeral=True)
         
-        campaign = await db.campaigns.get_campaign(campaign_id, interaction.guild_id)
+        campaign = await db.campaigns.get_campaign_with_forms(campaign_id, interaction.guild_id)
         if not campaign:
             await interaction.followup.send("❌ Campaign not found.", ephemeral=True)
             return
-        buttons = await db.campaigns.get_campaign_forms(campaign_id)
+        buttons = campaign['forms']
         content = campaign.get('message_content')
         embed = None
         
@@ -517,19 +505,24 @@ class CampaignCog(commands.Cog):
         """View form responses for a campaign"""
         await interaction.response.defer(ephemeral=True)
         
-        responses = await db.campaigns.get_responses(campaign_id=campaign_id)
+        responses = []
+        async for response in db.campaigns.iter_responses(campaign_id=campaign_id, page_size=10):
+            responses.append(response)
+            if len(responses) == 10:
+                break
         
         if not responses:
             await interaction.followup.send("No responses found.", ephemeral=True)
             return
         
+        total = await db.campaigns.get_response_count(campaign_id)
         embed = discord.Embed(
             title="📊 Campaign Responses",
-            description=f"Total responses: {len(responses)}",
+            description=f"Total responses: {total}",
             color=discord.Color.blue()
         )
         
-        for response in responses[:10]:  # Show max 10
+        for response in responses:  # Show max 10
             user = interaction.guild.get_member(response['user_id'])
             user_name = user.name if user else f"User {response['user_id']}"
             
@@ -542,8 +535,8 @@ class CampaignCog(commands.Cog):
                 inline=False
             )
         
-        if len(responses) > 10:
-            embed.set_footer(text=f"Showing 10 of {len(responses)} responses")
+        if total > 10:
+            embed.set_footer(text=f"Showing 10 of {total} responses")
         
         await interaction.followup.send(embed=embed, ephemeral=True)
 
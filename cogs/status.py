@@ -20,6 +20,7 @@ class Status(commands.Cog):
             "Reciting Quran"
         ]
         self.current_forced_status = None
+        self._current_status = None
         self._reset_task = None
         self.rotate_status.start()
 
@@ -34,7 +35,9 @@ class Status(commands.Cog):
             return  # Don't rotate if forced
 
         status_text = random.choice(self.status_options)
-        await self.bot.change_presence(activity=discord.Game(name=status_text))
+        if status_text == self._current_status:
+            return  # Avoid a redundant presence update
+        await self._set_presence(status_text)
         logger.info(f"Rotated status to: {status_text}")
 
     @rotate_status.before_loop
@@ -44,7 +47,8 @@ class Status(commands.Cog):
     async def force_status(self, text: str, duration_minutes: int):
         """Forces a status for a set duration."""
         self.current_forced_status = text
-        await self.bot.change_presence(activity=discord.Game(name=text))
+        if text != self._current_status:
+            await self._set_presence(text)
         logger.info(f"Forced status to: {text} for {duration_minutes} minutes")
         if self._reset_task:
             self._reset_task.cancel()
@@ -58,10 +62,15 @@ class Status(commands.Cog):
             logger.info("Forced status expired. Resuming rotation.")
             if self.rotate_status.is_running():
                 new_status = random.choice(self.status_options)
-                await self.bot.change_presence(activity=discord.Game(name=new_status))
+                if new_status != self._current_status:
+                    await self._set_presence(new_status)
         except asyncio.CancelledError:
             pass # Task was cancelled, likely by a new force_status call
 
+    async def _set_presence(self, text: str):
+        await self.bot.change_presence(activity=discord.Game(name=text))
+        self._current_status = text
+
     def add_status_option(self, text: str):
         if text not in self.status_options:
             self.status_options.append(text)
@@ -1,5 +1,4 @@
-import re
-
+import emoji as emoji_data
 import nextcord as discord
 from nextcord import SlashOption
 from nextcord.ext import commands
@@ -12,6 +11,11 @@ class UserCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    @staticmethod
+    def _is_standard_emoji(text: str) -> bool:
+        """Accept a single unicode emoji, including multi-codepoint sequences (ZWJ, flags, skin tones)."""
+        return emoji_data.is_emoji(text)
+
     @discord.slash_command(name="help", description="Show all available commands")
     async def help(self, interaction: discord.Interaction):
         embed = discord.Embed(
@@ -124,11 +128,17 @@ class UserCog(commands.Cog):
         if not user or not user['registered']:
             await interaction.response.send_message("You're not registered! Use `/register` first.", ephemeral=True)
             return
-        custom_emoji_pattern = r"^<a?:[a-zA-Z0-9_]+:[0-9]+>$"
-        is_custom = bool(re.match(custom_emoji_pattern, emoji))
-        is_standard = len(emoji) == 1
-        
-        if not (is_custom or is_standard):
+        emoji = emoji.strip()
+        partial = discord.PartialEmoji.from_str(emoji)
+        if partial.id is not None:
+            # from_str matches a prefix only, so insist the input is the whole <:name:id> form
+            if str(partial) != emoji:
+                await interaction.response.send_message("❌ Invalid emoji! usage: `/emoji 🔥`\nMust be a single emoji or a valid custom Discord emoji.", ephemeral=True)
+                return
+            if interaction.guild is None or interaction.guild.get_emoji(partial.id) is None:
+                await interaction.response.send_message("❌ That custom emoji isn't usable in this server", ephemeral=True)
+                return
+        elif not self._is_standard_emoji(emoji):
             await interaction.response.send_message("❌ Invalid emoji! usage: `/emoji 🔥`\nMust be a single emoji or a valid custom Discord emoji.", ephemeral=True)
             return
 
@@ -2,6 +2,7 @@
 import os
 
 from db.connection import DatabaseConnection
+from db.repositories import ai_whitelist
 from db.repositories.cache import CacheRepository
 from db.repositories.campaign import CampaignRepository
 from db.repositories.completion import CompletionRepository
@@ -26,7 +27,7 @@ class Database:
         if self.__class__._initialized:
             return
         data_dir = os.path.dirname(db_path)
-        if data_dir and not os.path.exists(data_dir):
+        if data_dir:
             os.makedirs(data_dir, exist_ok=True)
         self.connection = DatabaseConnection(db_path)
         self.guilds = GuildRepository(self.connection)
@@ -44,7 +45,10 @@ class Database:
         await self.connection.connect()
 
     async def close(self):
-        await self.connection.close()
+        try:
+            await self.file_storage.flush_access_times()
+        finally:
+            await self.connection.close()
     
     async def get_guild_config(self, guild_id: int):
         return await self.guilds.get(guild_id)
@@ -82,15 +86,30 @@ class Database:
     async def mark_page_complete(self, user_id: int, guild_id: int, page_number: int, date: str, session_id: int = None, is_late: bool = False):
         await self.completions.mark_complete(user_id, guild_id, page_number, date, session_id, is_late)
 
+    async def mark_pages_complete(self, user_id: int, guild_id: int, pages: list, date: str, session_id: int = None, is_late: bool = False):
+        await self.completions.mark_pages_complete(user_id, guild_id, pages, date, session_id, is_late)
+
+    async def mark_completions(self, entries: list):
+        await self.completions.mark_complete_many(entries)
+
     
     async def get_user_completions_for_date(self, user_id: int, guild_id: int, date: str):
         return await self.completions.get_user_completions_for_date(user_id, guild_id, date)
     
     async def get_all_completions_for_date(self, guild_id: int, date: str):
         return await self.completions.get_all_completions_for_date(guild_id, date)
+
+    async def get_completion_summary_for_date(self, guild_id: int, date: str):
+        return await self.completions.get_completion_summary_for_date(guild_id, date)
+
+    async def get_all_completions_for_date_with_users(self, guild_id: int, date: str):
+        return await self.completions.get_all_completions_for_date_with_users(guild_id, date)
+
+    async def get_completion_counts_for_session(self, session_id: int):
+        return await self.completions.get_completion_counts_for_session(session_id)
     
     async def create_daily_session(self, guild_id: int, session_date: str, start_page: int, end_page: int, message_ids: str):
-        await self.sessions.create(guild_id, session_date, start_page, end_page, message_ids)
+        return await self.sessions.create(guild_id, session_date, start_page, end_page, message_ids)
     
     async def get_today_session(self, guild_id: int, session_date: str):
         return await self.sessions.get_today(guild_id, session_date)
@@ -154,11 +173,15 @@ class Database:
 
     async def reset_guild_data(self, guild_id: int):
         """Reset all data for a guild (admin command)"""
-        await self.completions.clear_all(guild_id)
-        await self.sessions.clear_all(guild_id)
-        await self.users.clear_all(guild_id)
-        await self.schedules.clear_all(guild_id)
-        await self.guilds.delete(guild_id)
+        async with self.connection.transaction():
+            await self.completions.clear_all(guild_id)
+            await self.sessions.clear_all(guild_id)
+            await self.users.clear_all(guild_id)
+            await self.schedules.clear_all(guild_id)
+            await self.guilds.delete(guild_id)
+        # Again after commit: a read that ran before the commit could have re-cached the old row
+        self.guilds.invalidate(guild_id)
+        self.users.invalidate(guild_id=guild_id)
 
     async def get_user_language_preference(self, user_id: int, guild_id: int) -> str:
         return await self.users.get_language_preference(user_id, guild_id)
@@ -200,20 +223,24 @@ class Database:
     async def delete_user_memory(self, memory_id: int, user_id: int):
         await self.memories.delete_memory(memory_id, user_id)
 
-    # --- Low-level pass-throughs for repositories that import `db` directly ---
+    async def load_ai_whitelist(self) -> set:
+        return await ai_whitelist.load_whitelist(self.connection)
 
-    async def execute_write(self, query: str, params: tuple = ()):
-        """Write query pass-through to the underlying DatabaseConnection."""
-        await self.connection.execute_write(query, params)
+    async def add_to_ai_whitelist(self, guild_id: int) -> bool:
+        return await ai_whitelist.add_to_whitelist(self.connection, guild_id)
 
-    async def execute_one(self, query: str, params: tuple = ()):
-        """Single-row read pass-through to the underlying DatabaseConnection."""
-        return await self.connection.execute_one(query, params)
+    async def remove_from_ai_whitelist(self, guild_id: int) -> bool:
+        return await ai_whitelist.remove_from_whitelist(self.connection, guild_id)
 
-    async def execute_many(self, query: str, params: tuple = ()):
-        """Multi-row read pass-through to the underlying DatabaseConnection."""
-        return await self.connection.execute_many(query, params)
 
+_db = None
 
-db = Database()
 
+def __getattr__(name: str):
+    """Build the shared `db` instance on first access rather than at import time (PEP 562)."""
+    global _db
+    if name == "db":
+        if _db is None:
+            _db = Database()
+        return _db
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
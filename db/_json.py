@@ -0,0 +1,21 @@
+"""JSON encoding for TEXT columns. Uses orjson when installed, stdlib json otherwise."""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    def loads(raw):
+        return orjson.loads(raw)
+else:
+    def dumps(obj) -> str:
+        return json.dumps(obj)
+
+    def loads(raw):
+        return json.loads(raw)
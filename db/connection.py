@@ -1,43 +1,311 @@
+import asyncio
 import logging
+import os
+import re
+import sqlite3
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 import aiosqlite
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Applied to every connection, writer and readers alike.
+CONNECTION_PRAGMAS = """
+    PRAGMA busy_timeout=5000;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA cache_size=-65536;
+    PRAGMA mmap_size=268435456;
+"""
+
+# Writer only. WAL lets readers proceed while a write commits, and
+# synchronous=NORMAL is durable under WAL without an fsync on every commit.
+WRITER_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA wal_autocheckpoint=1000;
+    PRAGMA optimize=0x10002;
+"""
+
+READER_PRAGMAS = """
+    PRAGMA query_only=1;
+"""
+
+MIGRATION_VERSION_RE = re.compile(r"^(\d+)_")
+
+# Read-only connections opened alongside the writer by default: two per CPU, capped
+# because each keeps its own page cache. 0 sends all reads to the writer.
+READER_POOL_SIZE = min(2 * (os.cpu_count() or 1), 8)
+
+# Attempts for an operation that fails with "database is locked".
+LOCK_RETRY_ATTEMPTS = 3
+
+# What aiosqlite raises (as ValueError) once its connection has been closed.
+CLOSED_HANDLE_MESSAGES = frozenset({"Connection closed", "no active connection"})
+
+# Prepared statements kept per connection by sqlite3 (its default is 128). The
+# repositories use a fixed set of SQL strings, so hot queries are compiled once.
+STATEMENT_CACHE_SIZE = 256
+
+# run_sync reaches aiosqlite's worker thread through these private members, which
+# are not part of its API; without them bulk jobs fall back to per-statement calls.
+RUN_SYNC_SUPPORTED = hasattr(aiosqlite.Connection, "_execute") and hasattr(aiosqlite.Connection, "_conn")
+
+# Upper bound on how many queued writes are committed together by the writer task.
+WRITE_BATCH_SIZE = 256
+
+# Seconds the writer task waits for more writes to join a batch when only one is queued.
+# 0 commits a lone write immediately; a few ms trades write latency for larger batches.
+WRITE_BATCH_WINDOW = 0.0
+
 
 class DatabaseConnection:
-    def __init__(self, db_path: str = "wird.db"):
+    def __init__(self, db_path: str = "wird.db", reader_pool_size: int = READER_POOL_SIZE):
         self.db_path = db_path
+        self.reader_pool_size = reader_pool_size
         self.db: Optional[aiosqlite.Connection] = None
+        self._reader_pool: Optional[asyncio.Queue] = None
         self.migrations_dir = Path(__file__).parent.parent / "migrations"
+        self._write_lock = asyncio.Lock()
+        # Task that holds the open transaction. Keyed to the task rather than a ContextVar
+        # so tasks spawned inside the block don't inherit it and write past the lock.
+        self._transaction_owner: Optional[asyncio.Task] = None
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Set by close() so late calls fail fast instead of reaching a closed aiosqlite connection
+        self._closed = False
+        # Bumped by connect(); lets concurrent callers that lost the connection reconnect once
+        self._generation = 0
+        self._reconnect_lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        """Whether connect() has run and close() hasn't since."""
+        return self.db is not None and not self._closed
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether the current task is inside a `transaction()` block."""
+        owner = self._transaction_owner
+        return owner is not None and owner is asyncio.current_task()
+
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Group several writes into one BEGIN IMMEDIATE ... COMMIT.
+        `execute_write` calls made inside the block skip their own commit.
+        Nested blocks join the outer transaction.
+        """
+        if self.in_transaction:
+            yield
+            return
+        self._check_open()
+        async with self._write_lock:
+            self._transaction_owner = asyncio.current_task()
+            try:
+                await self.db.execute("BEGIN IMMEDIATE")
+                yield
+            except BaseException:
+                await self.db.rollback()
+                raise
+            else:
+                await self.db.commit()
+            finally:
+                self._transaction_owner = None
 
     async def connect(self):
+        # Connecting again (e.g. a second on_ready) replaces the old writer task and readers
+        await self._teardown()
+        self._closed = False
+        self._generation += 1
         await self._connect()
         await self._run_migrations()
+        await self._connect_readers()
+        self._write_queue = asyncio.Queue()
+        self._writer_task = asyncio.create_task(self._writer_loop())
 
     async def _connect(self):
-        self.db = await aiosqlite.connect(self.db_path)
+        self.db = await aiosqlite.connect(self.db_path, cached_statements=STATEMENT_CACHE_SIZE)
         self.db.row_factory = aiosqlite.Row
+        await self.db.executescript(CONNECTION_PRAGMAS + WRITER_PRAGMAS)
+        journal_mode = await self.execute_scalar("PRAGMA journal_mode")
+        if journal_mode != "wal" and self.db_path != ":memory:":
+            logger.warning(f"Could not enable WAL mode (journal_mode={journal_mode}); readers will block on writes")
+
+    async def _connect_readers(self):
+        """
+        Open a pool of read-only connections. Each aiosqlite connection has its own
+        worker thread, so under WAL several reads run in parallel without queueing
+        behind writes. An in-memory database can't be shared, so reads stay on the writer.
+        """
+        if self.db_path == ":memory:" or self.reader_pool_size < 1:
+            return
+        self._reader_pool = asyncio.Queue()
+        for _ in range(self.reader_pool_size):
+            self._reader_pool.put_nowait(await self._open_reader())
+
+    async def _open_reader(self) -> aiosqlite.Connection:
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        reader = await aiosqlite.connect(uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE)
+        reader.row_factory = aiosqlite.Row
+        await reader.executescript(CONNECTION_PRAGMAS + READER_PRAGMAS)
+        return reader
+
+    def _check_open(self):
+        # An open transaction may finish; close() waits for it before closing the writer
+        if self._closed and not self.in_transaction:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+
+    async def _fetchall(self, query: str, params: tuple):
+        self._check_open()
+        # Inside a transaction, read through the writer so uncommitted rows are visible.
+        if self.in_transaction:
+            return await self.db.execute_fetchall(query, params)
+        return await self._reconnecting(lambda: self._fetchall_pooled(query, params))
+
+    async def _fetchall_pooled(self, query: str, params: tuple):
+        pool = self._reader_pool
+        if pool is None:
+            return await self.db.execute_fetchall(query, params)
+        reader = await pool.get()
+        try:
+            return await self._retry_locked(lambda: reader.execute_fetchall(query, params))
+        finally:
+            if pool is self._reader_pool:
+                pool.put_nowait(reader)
+            else:
+                # The pool was replaced by a reconnect while this read ran
+                await reader.close()
+
+    async def _reconnecting(self, operation):
+        """
+        Run `operation`, reconnecting once if aiosqlite reports that its connection
+        was closed underneath us. A connection shut down by close() stays closed.
+        """
+        generation = self._generation
+        try:
+            return await operation()
+        except ValueError as e:
+            if str(e) not in CLOSED_HANDLE_MESSAGES or self._closed:
+                raise
+            async with self._reconnect_lock:
+                if self._generation == generation:
+                    logger.warning(f"Database connection lost, reconnecting: {e}")
+                    await self.connect()
+            return await operation()
+
+    @staticmethod
+    async def _retry_locked(operation):
+        """
+        Retry `operation` with exponential backoff while SQLite reports the database
+        as locked. Any other error is raised straight away.
+        """
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return await operation()
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or attempt == LOCK_RETRY_ATTEMPTS - 1:
+                    raise
+                logger.debug(f"Database locked, retrying (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(0.01 * (2 ** attempt))
 
     async def close(self):
+        """Final shutdown. Writes already queued still drain; anything issued afterwards is refused."""
+        self._closed = True
+        await self._teardown()
+
+    async def _teardown(self):
+        if self._writer_task:
+            # A writer that already stopped has failed whatever it left queued
+            if not self._writer_task.done():
+                await self._write_queue.join()
+            self._writer_task.cancel()
+            self._writer_task = None
+        if self._reader_pool:
+            while not self._reader_pool.empty():
+                await self._reader_pool.get_nowait().close()
+            self._reader_pool = None
         if self.db:
-            await self.db.close()
+            async with self._write_lock:
+                await self.db.close()
+            self.db = None
+
+    async def _writer_loop(self):
+        """
+        Group commit: drain whatever writes are queued (up to WRITE_BATCH_SIZE)
+        and commit them together. A lone write at idle is committed immediately.
+        """
+        batch = []
+        try:
+            while True:
+                batch = [await self._write_queue.get()]
+                if WRITE_BATCH_WINDOW and self._write_queue.empty():
+                    await asyncio.sleep(WRITE_BATCH_WINDOW)
+                while len(batch) < WRITE_BATCH_SIZE and not self._write_queue.empty():
+                    batch.append(self._write_queue.get_nowait())
+                try:
+                    async with self._write_lock:
+                        await self._commit_batch(batch)
+                except Exception as e:
+                    # e.g. the rollback itself failed; keep serving later writes
+                    logger.error(f"Write batch failed: {e}")
+                    self._fail_writes(batch, e)
+                finally:
+                    for _ in batch:
+                        self._write_queue.task_done()
+                batch = []
+        finally:
+            # Nothing will serve these once the task exits (close() cancels it)
+            error = sqlite3.ProgrammingError("The database writer has stopped.")
+            self._fail_writes(batch, error)
+            while not self._write_queue.empty():
+                self._fail_writes([self._write_queue.get_nowait()], error)
+                self._write_queue.task_done()
+
+    @staticmethod
+    def _fail_writes(batch: list, error: BaseException):
+        for _, _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    async def _commit_batch(self, batch: list):
+        try:
+            await self.db.execute("BEGIN IMMEDIATE")
+            results = []
+            for query, params, fetch, future in batch:
+                try:
+                    results.append((future, await self._execute(query, params, fetch)))
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+            await self.db.commit()
+        except Exception as e:
+            await self.db.rollback()
+            self._fail_writes(batch, e)
+            return
+        for future, result in results:
+            if not future.done():
+                future.set_result(result)
 
     async def _run_migrations(self):
         await self._ensure_migrations_table()
+        applied = await self._get_applied_migrations()
         migration_files = sorted(self.migrations_dir.glob("*.sql"))
         for migration_file in migration_files:
-            version = int(migration_file.stem.split("_")[0])
+            match = MIGRATION_VERSION_RE.match(migration_file.name)
+            if not match:
+                logger.warning(f"Skipping migration file without a version prefix: {migration_file.name}")
+                continue
+            version = int(match.group(1))
             name = migration_file.stem
-            already_applied = await self._is_migration_applied(version)
-            if already_applied:
+            if version in applied:
                 logger.debug(f"Migration {name} already applied, skipping")
                 continue
             logger.info(f"Applying migration: {name}")
-            with open(migration_file, 'r') as f:
-                sql = f.read()
+            sql = await asyncio.to_thread(migration_file.read_text, encoding="utf-8")
             try:
                 await self.db.execute("BEGIN;")
                 cursor = await self.db.executescript(sql)
@@ -61,11 +329,9 @@ class DatabaseConnection:
         """)
         await self.db.commit()
 
-    async def _is_migration_applied(self, version: int) -> bool:
-        async with self.db.execute(
-            "SELECT 1 FROM migrations WHERE version = ?", (version,)
-        ) as cursor:
-            return await cursor.fetchone() is not None
+    async def _get_applied_migrations(self) -> set:
+        rows = await self.db.execute_fetchall("SELECT version FROM migrations")
+        return {row[0] for row in rows}
 
     async def _mark_migration_applied(self, version: int, name: str):
         await self.db.execute(
@@ -74,36 +340,95 @@ class DatabaseConnection:
         )
         await self.db.commit()
 
+    # Reads use execute_fetchall, which runs the query, fetches and closes the
+    # cursor in a single hop to aiosqlite's worker thread.
+
     async def execute_one(self, query: str, params: tuple = ()):
-        try:
-            async with self.db.execute(query, params) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
-        except Exception as e:
-            logger.warning(f"Database operation failed, attempting reconnection: {e}")
-            await self._connect()
-            async with self.db.execute(query, params) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        rows = await self._fetchall(query, params)
+        return dict(rows[0]) if rows else None
 
     async def execute_many(self, query: str, params: tuple = ()):
+        rows = await self._fetchall(query, params)
+        return [dict(row) for row in rows]
+
+    async def execute_one_row(self, query: str, params: tuple = ()) -> Optional[aiosqlite.Row]:
+        """Like execute_one, but returns the read-only Row (key and index access) without copying."""
+        rows = await self._fetchall(query, params)
+        return rows[0] if rows else None
+
+    async def execute_many_rows(self, query: str, params: tuple = ()) -> list:
+        """Like execute_many, but returns Rows as-is; use execute_many when callers mutate the result."""
+        return list(await self._fetchall(query, params))
+
+    async def execute_scalar(self, query: str, params: tuple = ()):
+        """First column of the first row (or None), without building a dict."""
+        rows = await self._fetchall(query, params)
+        return rows[0][0] if rows else None
+
+    async def execute_column(self, query: str, params: tuple = ()) -> list:
+        """First column of every row, without building a dict per row."""
+        rows = await self._fetchall(query, params)
+        return [row[0] for row in rows]
+
+    async def execute_write(self, query: str, params: tuple = ()) -> Optional[int]:
+        """Run a write; returns the cursor's lastrowid (meaningful for INSERTs)."""
+        return await self._write(query, params, fetch=False)
+
+    async def execute_writemany(self, query: str, params_seq):
+        """Run one statement for every parameter tuple, committed as a single transaction."""
+        async with self.transaction():
+            cursor = await self.db.executemany(query, params_seq)
+            await cursor.close()
+
+    async def run_sync(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """
+        Call `fn(conn)` with the writer's underlying sqlite3 connection, inside a
+        transaction and on aiosqlite's worker thread, so a bulk job of many statements
+        costs one thread hop instead of one or two per statement. `fn` must not commit.
+        Check RUN_SYNC_SUPPORTED first; other aiosqlite versions raise NotImplementedError.
+        """
+        if not RUN_SYNC_SUPPORTED:
+            raise NotImplementedError(f"run_sync needs aiosqlite internals missing from {aiosqlite.__version__}")
+        async with self.transaction():
+            # aiosqlite has no public hook for this; _execute is how its own methods
+            # reach the worker thread, and the connection can only be used from there.
+            return await self.db._execute(fn, self.db._conn)
+
+    async def execute_write_returning(self, query: str, params: tuple = ()) -> Optional[dict]:
+        """Run a write with a RETURNING clause and return its first row (or None)."""
+        return await self._write(query, params, fetch=True)
+
+    async def _write(self, query: str, params: tuple, fetch: bool):
+        self._check_open()
+        if self.in_transaction:
+            return await self._execute(query, params, fetch)
+        return await self._reconnecting(
+            lambda: self._retry_locked(lambda: self._submit_write(query, params, fetch))
+        )
+
+    async def _submit_write(self, query: str, params: tuple, fetch: bool):
+        if self._writer_task is None or self._writer_task.done():
+            async with self._write_lock:
+                return await self._execute_and_commit(query, params, fetch)
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((query, params, fetch, future))
+        return await future
+
+    async def _execute(self, query: str, params: tuple, fetch: bool):
+        cursor = await self.db.execute(query, params)
         try:
-            async with self.db.execute(query, params) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
-        except Exception as e:
-            logger.warning(f"Database operation failed, attempting reconnection: {e}")
-            await self._connect()
-            async with self.db.execute(query, params) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            if fetch:
+                row = await cursor.fetchone()
+                return dict(row) if row else None
+            return cursor.lastrowid
+        finally:
+            await cursor.close()
 
-    async def execute_write(self, query: str, params: tuple = ()):
+    async def _execute_and_commit(self, query: str, params: tuple, fetch: bool):
         try:
-            await self.db.execute(query, params)
-            await self.db.commit()
-        except Exception as e:
-            logger.warning(f"Database operation failed, attempting reconnection: {e}")
-            await self._connect()
-            await self.db.execute(query, params)
+            result = await self._execute(query, params, fetch)
             await self.db.commit()
+            return result
+        except Exception:
+            await self.db.rollback()
+            raise
@@ -1,28 +1,34 @@
 import logging
-from database import db
+
+from db.connection import DatabaseConnection
 
 logger = logging.getLogger(__name__)
 
 
-async def load_whitelist() -> set[int]:
+async def load_whitelist(db: DatabaseConnection) -> set[int]:
     """Load all whitelisted guild IDs from the database."""
-    rows = await db.execute_many("SELECT guild_id FROM ai_code_whitelist", ())
-    return {row['guild_id'] for row in rows}
+    return set(await db.execute_column("SELECT guild_id FROM ai_code_whitelist"))
 
 
-async def add_to_whitelist(guild_id: int) -> None:
-    """Add a guild to the persistent whitelist."""
-    await db.execute_write(
-        "INSERT OR IGNORE INTO ai_code_whitelist (guild_id) VALUES (?)",
+async def add_to_whitelist(db: DatabaseConnection, guild_id: int) -> bool:
+    """Add a guild to the persistent whitelist. Returns False if it was already listed."""
+    row = await db.execute_write_returning(
+        "INSERT OR IGNORE INTO ai_code_whitelist (guild_id) VALUES (?) RETURNING guild_id",
         (guild_id,)
     )
+    if row is None:
+        return False
     logger.info(f"AI whitelist: added guild {guild_id}")
+    return True
 
 
-async def remove_from_whitelist(guild_id: int) -> None:
-    """Remove a guild from the persistent whitelist."""
-    await db.execute_write(
-        "DELETE FROM ai_code_whitelist WHERE guild_id = ?",
+async def remove_from_whitelist(db: DatabaseConnection, guild_id: int) -> bool:
+    """Remove a guild from the persistent whitelist. Returns False if it wasn't listed."""
+    row = await db.execute_write_returning(
+        "DELETE FROM ai_code_whitelist WHERE guild_id = ? RETURNING guild_id",
         (guild_id,)
     )
+    if row is None:
+        return False
     logger.info(f"AI whitelist: removed guild {guild_id}")
+    return True
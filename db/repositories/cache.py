@@ -1,68 +1,130 @@
-import json
+from collections import OrderedDict
 from typing import Any, Dict, List, Optional
 
+import msgpack
+
+from db import _json
 from db.connection import DatabaseConnection
 
+# Pages kept in memory per cache table; pages are read far more often than written.
+# They are held as msgpack blobs and unpacked per read, so every caller gets its own copy.
+MEMORY_CACHE_SIZE = 512
+
+# Format marker for stored blobs. Rows written before msgpack are plain JSON text.
+MSGPACK_PREFIX = b"\x01"
+
+
+def _encode(data) -> bytes:
+    return MSGPACK_PREFIX + msgpack.packb(data, use_bin_type=True)
+
+
+def _decode(raw):
+    if isinstance(raw, bytes) and raw[:1] == MSGPACK_PREFIX:
+        return msgpack.unpackb(raw[1:], raw=False)
+    return _json.loads(raw)
+
 
 class CacheRepository:
+    __slots__ = ('db', '_translation_mem', '_tafsir_mem')
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
+        self._translation_mem: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._tafsir_mem: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    @staticmethod
+    def _mem_get(mem: OrderedDict, key: tuple):
+        blob = mem.get(key)
+        if blob is None:
+            return None
+        mem.move_to_end(key)
+        return _decode(blob)
+
+    @staticmethod
+    def _mem_put(mem: OrderedDict, key: tuple, blob: bytes):
+        mem[key] = blob
+        mem.move_to_end(key)
+        if len(mem) > MEMORY_CACHE_SIZE:
+            mem.popitem(last=False)
+
     async def get_translation_cache(self, page_number: int, language: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached translation data for a page and language."""
-        result = await self.db.execute_one(
+        key = (page_number, language)
+        data = self._mem_get(self._translation_mem, key)
+        if data is not None:
+            return data
+        result = await self.db.execute_one_row(
             """SELECT data FROM translation_cache 
                WHERE page_number = ? AND language = ?""",
             (page_number, language)
         )
         if result:
-            return json.loads(result['data'])
+            raw = result['data']
+            data = _decode(raw)
+            # Rows from before msgpack are JSON text; keep them in the blob format
+            blob = raw if isinstance(raw, bytes) and raw[:1] == MSGPACK_PREFIX else _encode(data)
+            self._mem_put(self._translation_mem, key, blob)
+            return data
         return None
 
     async def set_translation_cache(self, page_number: int, language: str, data: List[Dict[str, Any]]):
         """Cache translation data for a page and language."""
-        json_data = json.dumps(data)
+        blob = _encode(data)
         await self.db.execute_write(
             """INSERT OR REPLACE INTO translation_cache (page_number, language, data)
                VALUES (?, ?, ?)""",
-            (page_number, language, json_data)
+            (page_number, language, blob)
         )
+        self._mem_put(self._translation_mem, (page_number, language), blob)
+
     async def get_tafsir_cache(self, page_number: int, edition: str) -> Optional[List[Dict[str, Any]]]:
         """Get cached tafsir data for a page and edition."""
-        result = await self.db.execute_one(
+        key = (page_number, edition)
+        data = self._mem_get(self._tafsir_mem, key)
+        if data is not None:
+            return data
+        result = await self.db.execute_one_row(
             """SELECT data FROM tafsir_cache 
                WHERE page_number = ? AND edition = ?""",
             (page_number, edition)
         )
         if result:
-            return json.loads(result['data'])
+            raw = result['data']
+            data = _decode(raw)
+            # Rows from before msgpack are JSON text; keep them in the blob format
+            blob = raw if isinstance(raw, bytes) and raw[:1] == MSGPACK_PREFIX else _encode(data)
+            self._mem_put(self._tafsir_mem, key, blob)
+            return data
         return None
 
     async def set_tafsir_cache(self, page_number: int, edition: str, data: List[Dict[str, Any]]):
         """Cache tafsir data for a page and edition."""
-        json_data = json.dumps(data)
+        blob = _encode(data)
         await self.db.execute_write(
             """INSERT OR REPLACE INTO tafsir_cache (page_number, edition, data)
                VALUES (?, ?, ?)""",
-            (page_number, edition, json_data)
+            (page_number, edition, blob)
         )
+        self._mem_put(self._tafsir_mem, (page_number, edition), blob)
+
     async def clear_translation_cache(self):
         """Clear all translation cache."""
         await self.db.execute_write("DELETE FROM translation_cache")
+        self._translation_mem.clear()
 
     async def clear_tafsir_cache(self):
         """Clear all tafsir cache."""
         await self.db.execute_write("DELETE FROM tafsir_cache")
+        self._tafsir_mem.clear()
 
     async def get_cache_stats(self) -> Dict[str, int]:
         """Get statistics about cache usage."""
-        translation_count = await self.db.execute_one(
-            "SELECT COUNT(*) as count FROM translation_cache"
-        )
-        tafsir_count = await self.db.execute_one(
-            "SELECT COUNT(*) as count FROM tafsir_cache"
+        row = await self.db.execute_one_row(
+            """SELECT (SELECT COUNT(*) FROM translation_cache) AS translations,
+                      (SELECT COUNT(*) FROM tafsir_cache) AS tafsir"""
         )
         
         return {
-            'translations': translation_count['count'] if translation_count else 0,
-            'tafsir': tafsir_count['count'] if tafsir_count else 0
+            'translations': row['translations'] if row else 0,
+            'tafsir': row['tafsir'] if row else 0
         }
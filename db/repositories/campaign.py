@@ -1,9 +1,124 @@
 """Campaign repository for mass messaging and form management"""
-import json
-from typing import Any, Dict, List, Optional
+from collections.abc import MutableMapping
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from db import _json
+
+CAMPAIGN_COLUMNS = frozenset({
+    'id', 'guild_id', 'name', 'message_content', 'embed_title', 'embed_description',
+    'embed_color', 'embed_image_url', 'embed_thumbnail_url', 'target_type',
+    'target_channel_id', 'target_role_ids', 'target_user_ids', 'created_by',
+    'created_at', 'status',
+})
+
+FORM_COLUMNS = (
+    'id', 'campaign_id', 'button_label', 'button_style', 'button_emoji',
+    'button_order', 'has_form', 'modal_title', 'form_fields', 'response_channel_id',
+)
+
+# Form columns are prefixed with f_ so they don't collide with the campaign's
+_CAMPAIGN_WITH_FORMS_SQL = (
+    "SELECT c.*, " + ", ".join(f"f.{column} AS f_{column}" for column in FORM_COLUMNS) + " "
+    "FROM campaigns c LEFT JOIN campaign_forms f ON f.campaign_id = c.id "
+    "WHERE c.id = ?{guild_filter} ORDER BY f.button_order"
+)
+
+# Fields the campaign list views show
+CAMPAIGN_LIST_COLUMNS = ('id', 'name', 'status', 'target_type', 'created_at')
+
+# get_responses/iter_responses filters, in the order of their mask bits
+RESPONSE_FILTER_COLUMNS = ('campaign_id', 'form_id', 'user_id', 'guild_id')
+
+
+def _build_response_queries() -> Dict[Tuple[int, bool], str]:
+    """
+    SQL for every combination of response filters, keyed by (filter bitmask, after_cursor).
+    `after_cursor` adds the keyset condition used for every page after the first.
+    """
+    queries = {}
+    for mask in range(1 << len(RESPONSE_FILTER_COLUMNS)):
+        conditions = [f"{column} = ?" for bit, column in enumerate(RESPONSE_FILTER_COLUMNS) if mask & (1 << bit)]
+        for after_cursor in (False, True):
+            page_conditions = conditions + ["(submitted_at, id) < (?, ?)"] if after_cursor else conditions
+            where_clause = " AND ".join(page_conditions) if page_conditions else "1=1"
+            queries[mask, after_cursor] = (
+                f"SELECT * FROM campaign_responses WHERE {where_clause} "
+                "ORDER BY submitted_at DESC, id DESC LIMIT ?"
+            )
+    return queries
+
+
+_RESPONSE_QUERIES = _build_response_queries()
+
+
+def _dump_json_column(column: str, value, expected_type: type) -> Optional[str]:
+    """
+    Serialize a JSON column for writing, or None for an empty value. Anything that
+    isn't `expected_type` or can't be encoded is rejected here, so stored JSON always parses.
+    """
+    if not value:
+        return None
+    if not isinstance(value, expected_type):
+        raise ValueError(f"{column} must be a {expected_type.__name__}, got {type(value).__name__}")
+    try:
+        return _json.dumps(value)
+    except TypeError as e:
+        raise ValueError(f"{column} is not JSON-serializable: {e}") from e
+
+
+class LazyJSONRow(MutableMapping):
+    """
+    A row mapping whose JSON columns are parsed on first read rather than when fetched.
+    `json_columns` maps each column to the factory for its empty value, used when
+    the column is NULL. Values are validated on write, so reads don't guard the parse.
+    Every read path (get, items, dict(row), copy(), ==, ...) goes through __getitem__,
+    so a copy never sees the raw JSON text.
+    """
+    __slots__ = ('_data', '_pending')
+
+    def __init__(self, row, json_columns: Dict[str, Callable[[], Any]]):
+        self._data = dict(row)
+        self._pending = {column: empty for column, empty in json_columns.items() if column in self._data}
+
+    def __getitem__(self, key):
+        if key in self._pending:
+            empty = self._pending.pop(key)
+            raw = self._data[key]
+            self._data[key] = _json.loads(raw) if raw else empty()
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._pending.pop(key, None)
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        self._pending.pop(key, None)
+        del self._data[key]
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+CAMPAIGN_JSON_COLUMNS = {'target_role_ids': list, 'target_user_ids': list}
+FORM_JSON_COLUMNS = {'form_fields': list}
+RESPONSE_JSON_COLUMNS = {'response_data': dict}
 
 
 class CampaignRepository:
+    __slots__ = ('connection',)
+
     def __init__(self, connection):
         self.connection = connection
 
@@ -24,8 +139,8 @@ class CampaignRepository:
         target_user_ids: Optional[List[int]] = None
     ) -> int:
         """Create a new campaign and return its ID"""
-        role_ids_json = json.dumps(target_role_ids) if target_role_ids else None
-        user_ids_json = json.dumps(target_user_ids) if target_user_ids else None
+        role_ids_json = _dump_json_column('target_role_ids', target_role_ids, list)
+        user_ids_json = _dump_json_column('target_user_ids', target_user_ids, list)
         
         query = """
             INSERT INTO campaigns (
@@ -34,58 +149,83 @@ class CampaignRepository:
                 target_type, target_channel_id, target_role_ids, target_user_ids, created_by
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        await self.connection.execute_write(
+        return await self.connection.execute_write(
             query, (guild_id, name, message_content, embed_title, embed_description,
             embed_color, embed_image_url, embed_thumbnail_url,
             target_type, target_channel_id, role_ids_json, user_ids_json, created_by)
         )
-        row = await self.connection.execute_one(
-            "SELECT id FROM campaigns WHERE guild_id = ? ORDER BY id DESC LIMIT 1",
-            (guild_id,)
-        )
-        return row['id'] if row else None
 
     async def get_campaign(self, campaign_id: int, guild_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
         """Get a campaign by ID"""
         if guild_id:
             query = "SELECT * FROM campaigns WHERE id = ? AND guild_id = ?"
-            result = await self.connection.execute_one(query, (campaign_id, guild_id))
+            row = await self.connection.execute_one_row(query, (campaign_id, guild_id))
         else:
             query = "SELECT * FROM campaigns WHERE id = ?"
-            result = await self.connection.execute_one(query, (campaign_id,))
-        if result:
-            if result.get('target_role_ids'):
-                try:
-                    result['target_role_ids'] = json.loads(result['target_role_ids'])
-                except Exception:
-                    result['target_role_ids'] = []
-            else:
-                result['target_role_ids'] = []
-            
-            if result.get('target_user_ids'):
-                try:
-                    result['target_user_ids'] = json.loads(result['target_user_ids'])
-                except Exception:
-                    result['target_user_ids'] = []
-            else:
-                result['target_user_ids'] = []
-        
-        return result
+            row = await self.connection.execute_one_row(query, (campaign_id,))
+        return LazyJSONRow(row, CAMPAIGN_JSON_COLUMNS) if row else None
+
+    async def get_campaign_with_forms(self, campaign_id: int, guild_id: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get a campaign and its forms/buttons in one query. The forms, ordered as in
+        get_campaign_forms, are under the 'forms' key.
+        """
+        query = _CAMPAIGN_WITH_FORMS_SQL.format(guild_filter=" AND c.guild_id = ?" if guild_id else "")
+        params = (campaign_id, guild_id) if guild_id else (campaign_id,)
+        rows = await self.connection.execute_many_rows(query, params)
+        if not rows:
+            return None
 
-    async def get_campaigns(self, guild_id: int, status: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get all campaigns for a guild, optionally filtered by status"""
+        first = rows[0]
+        campaign = LazyJSONRow({key: first[key] for key in first.keys() if not key.startswith('f_')}, CAMPAIGN_JSON_COLUMNS)
+        # A campaign without forms comes back as one row with NULL form columns
+        campaign['forms'] = [
+            LazyJSONRow({column: row['f_' + column] for column in FORM_COLUMNS}, FORM_JSON_COLUMNS)
+            for row in rows
+            if row['f_id'] is not None
+        ]
+        return campaign
+
+    async def get_campaigns(
+        self,
+        guild_id: int,
+        status: Optional[str] = None,
+        *,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        columns: Sequence[str] = CAMPAIGN_LIST_COLUMNS
+    ) -> List[Dict[str, Any]]:
+        """
+        Get campaigns for a guild, newest first, optionally filtered by status.
+        Only `columns` are selected (list-view fields by default); use get_campaign for the full row.
+        """
+        unknown = set(columns) - CAMPAIGN_COLUMNS
+        if unknown:
+            raise ValueError(f"Unknown campaign columns: {', '.join(sorted(unknown))}")
+        select = ", ".join(columns)
+        # LIMIT -1 means no limit in SQLite
+        page = (limit if limit is not None else -1, offset)
         if status:
-            query = "SELECT * FROM campaigns WHERE guild_id = ? AND status = ? ORDER BY created_at DESC"
-            return await self.connection.execute_many(query, (guild_id, status))
+            query = f"SELECT {select} FROM campaigns WHERE guild_id = ? AND status = ? ORDER BY created_at DESC LIMIT ? OFFSET ?"
+            return await self.connection.execute_many(query, (guild_id, status, *page))
         else:
-            query = "SELECT * FROM campaigns WHERE guild_id = ? ORDER BY created_at DESC"
-            return await self.connection.execute_many(query, (guild_id,))
+            query = f"SELECT {select} FROM campaigns WHERE guild_id = ? ORDER BY created_at DESC LIMIT ? OFFSET ?"
+            return await self.connection.execute_many(query, (guild_id, *page))
 
     async def update_campaign_status(self, campaign_id: int, status: str) -> None:
         """Update campaign status"""
         query = "UPDATE campaigns SET status = ? WHERE id = ?"
         await self.connection.execute_write(query, (status, campaign_id))
 
+    async def set_targets(self, campaign_id: int, role_ids: List[int], user_ids: List[int]) -> None:
+        """Replace a campaign's target roles and users"""
+        query = "UPDATE campaigns SET target_role_ids = ?, target_user_ids = ? WHERE id = ?"
+        await self.connection.execute_write(query, (
+            _dump_json_column('target_role_ids', role_ids, list),
+            _dump_json_column('target_user_ids', user_ids, list),
+            campaign_id
+        ))
+
     async def delete_campaign(self, campaign_id: int, guild_id: int) -> None:
         """Delete a campaign"""
         query = "DELETE FROM campaigns WHERE id = ? AND guild_id = ?"
@@ -104,7 +244,7 @@ class CampaignRepository:
         response_channel_id: Optional[int] = None
     ) -> int:
         """Add a button/form to a campaign"""
-        form_fields_json = json.dumps(form_fields) if form_fields else None
+        form_fields_json = _dump_json_column('form_fields', form_fields, list)
         
         query = """
             INSERT INTO campaign_forms (
@@ -112,43 +252,42 @@ class CampaignRepository:
                 button_order, has_form, modal_title, form_fields, response_channel_id
             ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """
-        await self.connection.execute_write(
+        return await self.connection.execute_write(
             query, (campaign_id, button_label, button_style, button_emoji,
             button_order, int(has_form), modal_title, form_fields_json, response_channel_id)
         )
-        row = await self.connection.execute_one(
-            "SELECT id FROM campaign_forms WHERE campaign_id = ? ORDER BY id DESC LIMIT 1",
-            (campaign_id,)
-        )
-        return row['id'] if row else None
 
     async def get_campaign_forms(self, campaign_id: int) -> List[Dict[str, Any]]:
         """Get all forms/buttons for a campaign"""
         query = "SELECT * FROM campaign_forms WHERE campaign_id = ? ORDER BY button_order"
-        results = await self.connection.execute_many(query, (campaign_id,))
-        for result in results:
-            if result.get('form_fields'):
-                try:
-                    result['form_fields'] = json.loads(result['form_fields'])
-                except Exception:
-                    result['form_fields'] = []
-            else:
-                result['form_fields'] = []
-        
-        return results
+        rows = await self.connection.execute_many_rows(query, (campaign_id,))
+        return [LazyJSONRow(row, FORM_JSON_COLUMNS) for row in rows]
 
     async def get_form(self, form_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific form by ID"""
         query = "SELECT * FROM campaign_forms WHERE id = ?"
-        result = await self.connection.execute_one(query, (form_id,))
-        
-        if result and result.get('form_fields'):
-            try:
-                result['form_fields'] = json.loads(result['form_fields'])
-            except Exception:
-                result['form_fields'] = []
-        
-        return result
+        row = await self.connection.execute_one_row(query, (form_id,))
+        return LazyJSONRow(row, FORM_JSON_COLUMNS) if row else None
+
+    async def set_form_fields(
+        self,
+        form_id: int,
+        modal_title: str,
+        form_fields: List[Dict[str, Any]],
+        response_channel_id: Optional[int] = None
+    ) -> None:
+        """Turn a button into a form with the given modal fields"""
+        query = """
+            UPDATE campaign_forms 
+            SET has_form = 1, modal_title = ?, form_fields = ?, response_channel_id = ?
+            WHERE id = ?
+        """
+        await self.connection.execute_write(query, (
+            modal_title,
+            _dump_json_column('form_fields', form_fields, list),
+            response_channel_id,
+            form_id
+        ))
 
     async def delete_form(self, form_id: int) -> None:
         """Delete a form/button"""
@@ -164,21 +303,16 @@ class CampaignRepository:
         response_data: Dict[str, str]
     ) -> int:
         """Save a user's form response"""
-        response_json = json.dumps(response_data)
+        response_json = _dump_json_column('response_data', response_data, dict) or '{}'
         
         query = """
             INSERT INTO campaign_responses (
                 form_id, campaign_id, user_id, guild_id, response_data
             ) VALUES (?, ?, ?, ?, ?)
         """
-        await self.connection.execute_write(
+        return await self.connection.execute_write(
             query, (form_id, campaign_id, user_id, guild_id, response_json)
         )
-        row = await self.connection.execute_one(
-            "SELECT id FROM campaign_responses WHERE user_id = ? AND guild_id = ? ORDER BY id DESC LIMIT 1",
-            (user_id, guild_id)
-        )
-        return row['id'] if row else None
 
     async def get_responses(
         self,
@@ -188,37 +322,46 @@ class CampaignRepository:
         guild_id: Optional[int] = None
     ) -> List[Dict[str, Any]]:
         """Get responses with optional filters"""
-        conditions = []
+        return [
+            response async for response in self.iter_responses(
+                campaign_id=campaign_id, form_id=form_id, user_id=user_id, guild_id=guild_id
+            )
+        ]
+
+    async def iter_responses(
+        self,
+        campaign_id: Optional[int] = None,
+        form_id: Optional[int] = None,
+        user_id: Optional[int] = None,
+        guild_id: Optional[int] = None,
+        page_size: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield responses newest first, fetching `page_size` rows at a time.
+        Pages are keyed on (submitted_at, id), so rows aren't skipped or repeated
+        when new responses arrive mid-iteration.
+        """
+        filters = (campaign_id, form_id, user_id, guild_id)
+        mask = 0
         params = []
-        
-        if campaign_id:
-            conditions.append("campaign_id = ?")
-            params.append(campaign_id)
-        if form_id:
-            conditions.append("form_id = ?")
-            params.append(form_id)
-        if user_id:
-            conditions.append("user_id = ?")
-            params.append(user_id)
-        if guild_id:
-            conditions.append("guild_id = ?")
-            params.append(guild_id)
-        
-        where_clause = " AND ".join(conditions) if conditions else "1=1"
-        query = f"SELECT * FROM campaign_responses WHERE {where_clause} ORDER BY submitted_at DESC"
-        
-        results = await self.connection.execute_many(query, tuple(params))
-        for result in results:
-            if result.get('response_data'):
-                try:
-                    result['response_data'] = json.loads(result['response_data'])
-                except Exception:
-                    result['response_data'] = {}
-        
-        return results
+        for bit, value in enumerate(filters):
+            if value:
+                mask |= 1 << bit
+                params.append(value)
+        first_page_query = _RESPONSE_QUERIES[mask, False]
+        next_page_query = _RESPONSE_QUERIES[mask, True]
+
+        last_key = ()
+        while True:
+            query = next_page_query if last_key else first_page_query
+            rows = await self.connection.execute_many_rows(query, (*params, *last_key, page_size))
+            for row in rows:
+                yield LazyJSONRow(row, RESPONSE_JSON_COLUMNS)
+            if len(rows) < page_size:
+                return
+            last_key = (rows[-1]['submitted_at'], rows[-1]['id'])
 
     async def get_response_count(self, campaign_id: int) -> int:
         """Get total number of responses for a campaign"""
-        query = "SELECT COUNT(*) as count FROM campaign_responses WHERE campaign_id = ?"
-        result = await self.connection.execute_one(query, (campaign_id,))
-        return result['count'] if result else 0
+        query = "SELECT COUNT(*) FROM campaign_responses WHERE campaign_id = ?"
+        return await self.connection.execute_scalar(query, (campaign_id,)) or 0
@@ -1,46 +1,95 @@
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from db.connection import DatabaseConnection
 
+INSERT_COMPLETION_SQL = (
+    "INSERT INTO completions (user_id, guild_id, page_number, completion_date, session_id, is_late) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+SELECT_PAGES_FOR_DATE_SQL = (
+    "SELECT page_number FROM completions WHERE user_id = ? AND guild_id = ? AND completion_date = ?"
+)
+SELECT_PAGES_FOR_SESSION_SQL = "SELECT page_number FROM completions WHERE user_id = ? AND session_id = ?"
+
+# Sessions whose page range is kept in memory; oldest entries are dropped first.
+SESSION_RANGE_CACHE_SIZE = 1024
+
 
 class CompletionRepository:
+    __slots__ = ('db', '_session_range_cache')
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
+        self._session_range_cache: Dict[int, Tuple[int, int]] = {}
 
     async def mark_complete(self, user_id: int, guild_id: int, page_number: int, date: str, session_id: int = None, is_late: bool = False):
+        # A single page goes through the group-commit writer rather than its own transaction.
         await self.db.execute_write(
-            "INSERT INTO completions (user_id, guild_id, page_number, completion_date, session_id, is_late) VALUES (?, ?, ?, ?, ?, ?)",
+            INSERT_COMPLETION_SQL,
             (user_id, guild_id, page_number, date, session_id, is_late)
         )
 
-    async def get_user_completions_for_date(self, user_id: int, guild_id: int, date: str) -> List[int]:
-        rows = await self.db.execute_many(
-            "SELECT page_number FROM completions WHERE user_id = ? AND guild_id = ? AND completion_date = ?",
-            (user_id, guild_id, date)
+    async def mark_complete_many(self, entries: List[Tuple[int, int, int, str, Optional[int], bool]]):
+        """
+        Record many completions with one executemany in a single transaction.
+        Each entry is (user_id, guild_id, page_number, date, session_id, is_late).
+        """
+        if entries:
+            await self.db.execute_writemany(INSERT_COMPLETION_SQL, entries)
+
+    async def mark_pages_complete(self, user_id: int, guild_id: int, pages: List[int], date: str, session_id: int = None, is_late: bool = False):
+        """Record several pages for one user at once."""
+        await self.mark_complete_many(
+            [(user_id, guild_id, page, date, session_id, is_late) for page in pages]
         )
-        return [row['page_number'] for row in rows]
+
+    async def get_user_completions_for_date(self, user_id: int, guild_id: int, date: str) -> List[int]:
+        return await self.db.execute_column(SELECT_PAGES_FOR_DATE_SQL, (user_id, guild_id, date))
 
     async def get_user_completions_for_session(self, user_id: int, session_id: int) -> List[int]:
         """Get all pages completed by a user for a specific session."""
-        rows = await self.db.execute_many(
-            "SELECT page_number FROM completions WHERE user_id = ? AND session_id = ?",
-            (user_id, session_id)
-        )
-        return [row['page_number'] for row in rows]
+        return await self.db.execute_column(SELECT_PAGES_FOR_SESSION_SQL, (user_id, session_id))
 
     async def get_all_completions_for_date(self, guild_id: int, date: str) -> Dict[int, List[int]]:
-        rows = await self.db.execute_many(
-            "SELECT user_id, page_number, is_late FROM completions WHERE guild_id = ? AND completion_date = ?",
+        summary = await self.get_completion_summary_for_date(guild_id, date)
+        return {user_id: entry['pages'] for user_id, entry in summary.items()}
+
+    async def get_completion_summary_for_date(self, guild_id: int, date: str) -> Dict[int, Dict[str, Any]]:
+        """Get {user_id: {'pages': [...], 'is_late': bool}} for a date, grouped in SQL (one row per user)."""
+        rows = await self.db.execute_many_rows(
+            """SELECT user_id, GROUP_CONCAT(page_number) AS pages, MAX(is_late) AS is_late
+               FROM completions
+               WHERE guild_id = ? AND completion_date = ?
+               GROUP BY user_id""",
             (guild_id, date)
         )
-        
-        completions = {}
-        for row in rows:
-            user_id = row['user_id']
-            if user_id not in completions:
-                completions[user_id] = []
-            completions[user_id].append(row['page_number'])
-        return completions
+        return {
+            row['user_id']: {
+                'pages': [int(page) for page in row['pages'].split(',')],
+                'is_late': bool(row['is_late'])
+            }
+            for row in rows
+        }
+
+    async def get_all_completions_for_date_with_users(self, guild_id: int, date: str) -> List[Dict[str, Any]]:
+        """Completion rows for a date joined with the completing user's streak/preference fields."""
+        return await self.db.execute_many(
+            """SELECT c.user_id, c.page_number, c.is_late, c.session_id,
+                      u.current_streak, u.session_streak, u.last_completion_date,
+                      u.language_preference, u.tafsir_preference, u.streak_emoji
+               FROM completions c
+               JOIN users u ON u.user_id = c.user_id AND u.guild_id = c.guild_id
+               WHERE c.guild_id = ? AND c.completion_date = ?""",
+            (guild_id, date)
+        )
+
+    async def get_completion_counts_for_session(self, session_id: int) -> Dict[int, int]:
+        """Get {user_id: completed page count} for every user with completions in a session."""
+        rows = await self.db.execute_many_rows(
+            "SELECT user_id, COUNT(*) AS count FROM completions WHERE session_id = ? GROUP BY user_id",
+            (session_id,)
+        )
+        return {user_id: count for user_id, count in rows}
 
     async def get_late_completions_for_date(self, guild_id: int, date: str) -> List[int]:
         """Get list of user IDs who completed pages late on this date."""
@@ -66,24 +115,38 @@ class CompletionRepository:
         Returns {'is_late': bool} if completed.
         Checks if ALL pages are completed.
         """
-        row = await self.db.execute_one(
-            """SELECT ds.start_page, ds.end_page, COUNT(DISTINCT c.page_number) as completed_count, MAX(c.is_late) as is_late
-               FROM daily_sessions ds
-               LEFT JOIN completions c ON ds.id = c.session_id AND c.user_id = ?
-               WHERE ds.id = ?
-               GROUP BY ds.id""",
-            (user_id, session_id)
-        )
-        
-        if not row:
+        page_range = await self._get_session_range(session_id)
+        if page_range is None:
             return None
-            
-        total_pages = row['end_page'] - row['start_page'] + 1
-        if row['completed_count'] >= total_pages:
+        start_page, end_page = page_range
+
+        row = await self.db.execute_one_row(
+            """SELECT COUNT(DISTINCT page_number) AS completed_count, MAX(is_late) AS is_late
+               FROM completions
+               WHERE session_id = ? AND user_id = ? AND page_number BETWEEN ? AND ?""",
+            (session_id, user_id, start_page, end_page)
+        )
+        if row['completed_count'] >= end_page - start_page + 1:
             return {'is_late': bool(row['is_late'])}
-            
+
         return None
 
+    async def _get_session_range(self, session_id: int) -> Optional[Tuple[int, int]]:
+        """(start_page, end_page) of a session. Ranges never change and ids are never reused, so they're cached."""
+        page_range = self._session_range_cache.get(session_id)
+        if page_range is not None:
+            return page_range
+        row = await self.db.execute_one_row(
+            "SELECT start_page, end_page FROM daily_sessions WHERE id = ?",
+            (session_id,)
+        )
+        if row is None:
+            return None
+        if len(self._session_range_cache) >= SESSION_RANGE_CACHE_SIZE:
+            self._session_range_cache.pop(next(iter(self._session_range_cache)))
+        page_range = self._session_range_cache[session_id] = (row['start_page'], row['end_page'])
+        return page_range
+
     async def has_user_completed_session(self, user_id: int, session_id: int) -> bool:
         """Check if a user has completed all pages for a session."""
         status = await self.get_session_completion_status(user_id, session_id)
@@ -2,22 +2,114 @@
 File Storage Repository
 Handles user file storage operations with quota management.
 """
+import asyncio
 import logging
 import os
-from typing import Any, Dict, List, Optional
+import sqlite3
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from db.connection import DatabaseConnection
+from db.connection import RUN_SYNC_SUPPORTED, DatabaseConnection
+from utils.formatting import format_size
 
 logger = logging.getLogger(__name__)
 
+LIST_FILE_COLUMNS = (
+    "id, filename, original_filename, file_size, mime_type, description, created_at, updated_at"
+)
+
+
+class QuotaExceededError(Exception):
+    """Raised inside add_file's transaction when the new size would exceed MAX_USER_STORAGE."""
+    pass
+
+
+UPDATE_STORAGE_QUOTA_SQL = """
+    INSERT INTO user_storage (user_id, total_bytes_used, file_count)
+    VALUES (?, ?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET
+        total_bytes_used = total_bytes_used + ?,
+        file_count = file_count + ?,
+        last_updated = CURRENT_TIMESTAMP
+"""
+
+
+def _quota_params(user_id: int, bytes_delta: int, count_delta: int) -> tuple:
+    """Parameters for UPDATE_STORAGE_QUOTA_SQL; a new row starts from the non-negative delta."""
+    return (user_id, max(0, bytes_delta), max(0, count_delta), bytes_delta, count_delta)
+
+
+def _select_file_rows_sql(count: int) -> str:
+    return f"SELECT user_id, filename, file_path, file_size FROM user_files WHERE id IN ({', '.join('?' * count)})"
+
+
+def _delete_file_rows_sql(count: int) -> str:
+    return f"DELETE FROM user_files WHERE id IN ({', '.join('?' * count)})"
+
+
+def _quota_refunds(deleted) -> list:
+    """UPDATE_STORAGE_QUOTA_SQL parameters taking the deleted rows off each owner's quota."""
+    per_user = defaultdict(lambda: [0, 0])
+    for file_info in deleted:
+        totals = per_user[file_info['user_id']]
+        totals[0] += file_info['file_size']
+        totals[1] += 1
+    return [_quota_params(user_id, -bytes_freed, -count) for user_id, (bytes_freed, count) in per_user.items()]
+
+
+def _delete_file_rows(conn: sqlite3.Connection, file_ids: List[int], chunk_size: int) -> list:
+    """
+    Delete user_files rows by id and take their size off each owner's quota, all on
+    the caller's connection. Returns the deleted (user_id, filename, file_path, file_size) rows.
+    """
+    deleted = []
+    for start in range(0, len(file_ids), chunk_size):
+        chunk = file_ids[start:start + chunk_size]
+        deleted.extend(conn.execute(_select_file_rows_sql(len(chunk)), chunk).fetchall())
+        conn.execute(_delete_file_rows_sql(len(chunk)), chunk)
+    conn.executemany(UPDATE_STORAGE_QUOTA_SQL, _quota_refunds(deleted))
+    return deleted
+
+
+def _safe_unlink(path: str):
+    """Remove a file; one that's already gone counts as removed."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
 
 class FileStorageRepository:
     """Repository for managing user file storage."""
     MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB per file
     MAX_USER_STORAGE = 1024 * 1024 * 1024  # 1GB per user
+    USAGE_CACHE_TTL = 60  # Seconds a cached usage counter is trusted
+    USAGE_CACHE_SIZE = 10_000  # Users whose usage is kept in memory
+    DELETE_CHUNK_SIZE = 500  # Ids per IN (...) list, well under SQLite's bound-parameter limit
+    UNLINK_CONCURRENCY = 16  # Files removed from disk in parallel during cleanup
+    ACCESS_FLUSH_INTERVAL = 5  # Seconds between last_accessed batch writes
+    ACCESS_FLUSH_SIZE = 500  # Pending accesses that force an immediate write
+    MISS_CACHE_TTL = 30  # Seconds a "no such file" answer is reused
+    MISS_CACHE_SIZE = 4096  # Lookups whose miss is remembered
     
+    __slots__ = (
+        'db', '_usage_cache', '_access_buffer', '_access_flush_task',
+        '_miss_cache', '_miss_generation',
+    )
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
+        # user_id -> (total_bytes_used, file_count, monotonic time loaded)
+        self._usage_cache: OrderedDict[int, Tuple[int, int, float]] = OrderedDict()
+        # (user_id, filename) -> last access timestamp not yet written
+        self._access_buffer: Dict[Tuple[int, str], str] = {}
+        self._access_flush_task: Optional[asyncio.Task] = None
+        # ('name', user_id, filename) or ('id', file_id) -> monotonic time the lookup missed
+        self._miss_cache: OrderedDict[tuple, float] = OrderedDict()
+        # Bumped whenever a file appears so a lookup that raced with it isn't cached as a miss
+        self._miss_generation = 0
     
     async def add_file(
         self,
@@ -30,52 +122,126 @@ class FileStorageRepository:
         description: str = None
     ) -> Optional[int]:
         """
-        Add a file record to the database.
+        Add a file record to the database, replacing any existing record with the same filename.
         Returns the file ID on success, None on failure.
         """
         try:
-            await self.db.execute_write(
-                """INSERT INTO user_files 
-                   (user_id, filename, original_filename, file_path, file_size, mime_type, description)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (user_id, filename, original_filename, file_path, file_size, mime_type, description)
-            )
-            await self._update_storage_quota(user_id, file_size, 1)
-            result = await self.db.execute_one(
-                "SELECT id FROM user_files WHERE user_id = ? AND filename = ?",
-                (user_id, filename)
-            )
-            return result['id'] if result else None
+            async with self.db.transaction():
+                old_size = await self.db.execute_scalar(
+                    "SELECT file_size FROM user_files WHERE user_id = ? AND filename = ?",
+                    (user_id, filename)
+                )
+                row = await self.db.execute_write_returning(
+                    """INSERT INTO user_files 
+                       (user_id, filename, original_filename, file_path, file_size, mime_type, description)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT(user_id, filename) DO UPDATE SET
+                           original_filename = excluded.original_filename,
+                           file_path = excluded.file_path,
+                           file_size = excluded.file_size,
+                           mime_type = excluded.mime_type,
+                           description = excluded.description,
+                           updated_at = CURRENT_TIMESTAMP,
+                           last_accessed = CURRENT_TIMESTAMP
+                       RETURNING id""",
+                    (user_id, filename, original_filename, file_path, file_size, mime_type, description)
+                )
+                bytes_delta = file_size - (old_size or 0)
+                count_delta = 0 if old_size is not None else 1
+                if not await self._reserve_storage_quota(user_id, bytes_delta, count_delta):
+                    raise QuotaExceededError(f"User {user_id} has no room for {filename}")
+            self._adjust_cached_usage(user_id, bytes_delta, count_delta)
+            self._miss_cache.pop(('id', row['id']), None)
+            return row['id']
             
+        except QuotaExceededError as e:
+            # Another upload used the space after can_upload passed; the cached usage is stale
+            self.invalidate_usage(user_id)
+            logger.warning(f"Failed to add file record: {e}")
+            return None
         except Exception as e:
             logger.error(f"Failed to add file record: {e}")
             return None
+        finally:
+            self._file_appeared(user_id, filename)
     
     async def get_file(self, user_id: int, filename: str) -> Optional[Dict[str, Any]]:
-        """Get a file record by user and filename."""
-        return await self.db.execute_one(
+        """Get a file record by user and filename. Callers use most columns, so this reads the whole row."""
+        return await self._lookup(
+            ('name', user_id, filename),
             "SELECT * FROM user_files WHERE user_id = ? AND filename = ?",
             (user_id, filename)
         )
     
     async def get_file_by_id(self, file_id: int) -> Optional[Dict[str, Any]]:
         """Get a file record by ID."""
-        return await self.db.execute_one(
+        return await self._lookup(
+            ('id', file_id),
             "SELECT * FROM user_files WHERE id = ?",
             (file_id,)
         )
     
-    async def list_files(self, user_id: int) -> List[Dict[str, Any]]:
-        """List all files for a user, ordered by creation date."""
+    async def _lookup(self, key: tuple, query: str, params: tuple) -> Optional[Dict[str, Any]]:
+        """Run a single-file lookup, answering recent misses (within MISS_CACHE_TTL) from memory."""
+        missed_at = self._miss_cache.get(key)
+        if missed_at is not None:
+            if time.monotonic() - missed_at < self.MISS_CACHE_TTL:
+                return None
+            del self._miss_cache[key]
+        generation = self._miss_generation
+        row = await self.db.execute_one(query, params)
+        if row is None and generation == self._miss_generation:
+            self._miss_cache[key] = time.monotonic()
+            if len(self._miss_cache) > self.MISS_CACHE_SIZE:
+                self._miss_cache.popitem(last=False)
+        return row
+    
+    def _file_appeared(self, user_id: int, filename: str):
+        """Forget a cached miss for a filename that may now exist. Called once the write has finished."""
+        self._miss_generation += 1
+        self._miss_cache.pop(('name', user_id, filename), None)
+    
+    async def list_files(
+        self,
+        user_id: int,
+        *,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """List a user's files, newest first. Pass limit/offset to fetch a single page."""
+        # LIMIT -1 means no limit in SQLite
         return await self.db.execute_many(
-            """SELECT id, filename, original_filename, file_size, mime_type, 
-                      description, created_at, updated_at
+            f"""SELECT {LIST_FILE_COLUMNS}
                FROM user_files 
                WHERE user_id = ? 
-               ORDER BY created_at DESC""",
-            (user_id,)
+               ORDER BY created_at DESC, id DESC
+               LIMIT ? OFFSET ?""",
+            (user_id, limit if limit is not None else -1, offset)
         )
     
+    async def iter_files(self, user_id: int, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield a user's files newest first, fetching `page_size` rows at a time.
+        Pages are keyed on (created_at, id), like CampaignRepository.iter_responses.
+        """
+        rows = await self.db.execute_many(
+            f"""SELECT {LIST_FILE_COLUMNS} FROM user_files
+               WHERE user_id = ?
+               ORDER BY created_at DESC, id DESC LIMIT ?""",
+            (user_id, page_size)
+        )
+        while True:
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            rows = await self.db.execute_many(
+                f"""SELECT {LIST_FILE_COLUMNS} FROM user_files
+                   WHERE user_id = ? AND (created_at, id) < (?, ?)
+                   ORDER BY created_at DESC, id DESC LIMIT ?""",
+                (user_id, rows[-1]['created_at'], rows[-1]['id'], page_size)
+            )
+    
     async def delete_file(self, user_id: int, filename: str) -> bool:
         """
         Delete a file record from the database.
@@ -83,16 +249,18 @@ class FileStorageRepository:
         Note: This only deletes the DB record, caller must delete actual file.
         """
         try:
-            file_info = await self.get_file(user_id, filename)
-            if not file_info:
-                return False
-            
-            file_size = file_info['file_size']
-            await self.db.execute_write(
-                "DELETE FROM user_files WHERE user_id = ? AND filename = ?",
-                (user_id, filename)
-            )
-            await self._update_storage_quota(user_id, -file_size, -1)
+            async with self.db.transaction():
+                file_info = await self.get_file(user_id, filename)
+                if not file_info:
+                    return False
+                
+                file_size = file_info['file_size']
+                await self.db.execute_write(
+                    "DELETE FROM user_files WHERE user_id = ? AND filename = ?",
+                    (user_id, filename)
+                )
+                await self._update_storage_quota(user_id, -file_size, -1)
+            self._adjust_cached_usage(user_id, -file_size, -1)
             
             return True
             
@@ -123,94 +291,143 @@ class FileStorageRepository:
                    WHERE user_id = ? AND filename = ?""",
                 (new_filename, user_id, old_filename)
             )
+            # A buffered access under the old name would update no row once flushed
+            accessed = self._access_buffer.pop((user_id, old_filename), None)
+            if accessed is not None and accessed > self._access_buffer.get((user_id, new_filename), ""):
+                self._access_buffer[(user_id, new_filename)] = accessed
             return True
         except Exception as e:
             logger.error(f"Failed to rename file: {e}")
             return False
+        finally:
+            self._file_appeared(user_id, new_filename)
     
     async def get_storage_usage(self, user_id: int) -> Dict[str, Any]:
-        """Get storage usage stats for a user."""
-        result = await self.db.execute_one(
-            "SELECT * FROM user_storage WHERE user_id = ?",
-            (user_id,)
-        )
+        """Get storage usage stats for a user. Counters are cached for USAGE_CACHE_TTL seconds."""
+        cached = self._usage_cache.get(user_id)
+        if cached and time.monotonic() - cached[2] < self.USAGE_CACHE_TTL:
+            self._usage_cache.move_to_end(user_id)
+            total_bytes_used, file_count, _ = cached
+        else:
+            result = await self.db.execute_one_row(
+                "SELECT total_bytes_used, file_count FROM user_storage WHERE user_id = ?",
+                (user_id,)
+            )
+            total_bytes_used, file_count = (result['total_bytes_used'], result['file_count']) if result else (0, 0)
+            self._usage_cache[user_id] = (total_bytes_used, file_count, time.monotonic())
+            self._usage_cache.move_to_end(user_id)
+            if len(self._usage_cache) > self.USAGE_CACHE_SIZE:
+                self._usage_cache.popitem(last=False)
         
-        if result:
-            return {
-                'total_bytes_used': result['total_bytes_used'],
-                'file_count': result['file_count'],
-                'bytes_remaining': self.MAX_USER_STORAGE - result['total_bytes_used'],
-                'max_storage': self.MAX_USER_STORAGE,
-                'max_file_size': self.MAX_FILE_SIZE,
-                'usage_percent': (result['total_bytes_used'] / self.MAX_USER_STORAGE) * 100
-            }
         return {
-            'total_bytes_used': 0,
-            'file_count': 0,
-            'bytes_remaining': self.MAX_USER_STORAGE,
+            'total_bytes_used': total_bytes_used,
+            'file_count': file_count,
+            'bytes_remaining': self.MAX_USER_STORAGE - total_bytes_used,
             'max_storage': self.MAX_USER_STORAGE,
             'max_file_size': self.MAX_FILE_SIZE,
-            'usage_percent': 0.0
+            'usage_percent': (total_bytes_used / self.MAX_USER_STORAGE) * 100
         }
     
+    def invalidate_usage(self, user_id: int):
+        """Drop a user's cached usage so the next read comes from the database."""
+        self._usage_cache.pop(user_id, None)
+    
+    def _adjust_cached_usage(self, user_id: int, bytes_delta: int, count_delta: int):
+        """Apply a committed quota change to the cached counter, keeping its original load time."""
+        cached = self._usage_cache.get(user_id)
+        if cached:
+            self._usage_cache[user_id] = (cached[0] + bytes_delta, cached[1] + count_delta, cached[2])
+    
     async def can_upload(self, user_id: int, file_size: int) -> tuple[bool, str]:
         """
         Check if a user can upload a file of given size.
         Returns (allowed, reason).
         """
         if file_size > self.MAX_FILE_SIZE:
-            return False, f"File exceeds maximum size of {self._format_size(self.MAX_FILE_SIZE)}"
+            return False, f"File exceeds maximum size of {format_size(self.MAX_FILE_SIZE)}"
         usage = await self.get_storage_usage(user_id)
         if usage['total_bytes_used'] + file_size > self.MAX_USER_STORAGE:
-            return False, f"Would exceed storage quota. Used: {self._format_size(usage['total_bytes_used'])}/{self._format_size(self.MAX_USER_STORAGE)}"
+            return False, f"Would exceed storage quota. Used: {format_size(usage['total_bytes_used'])}/{format_size(self.MAX_USER_STORAGE)}"
         
         return True, "OK"
     
     async def _update_storage_quota(self, user_id: int, bytes_delta: int, count_delta: int):
-        """Update the user's storage quota tracking."""
-        existing = await self.db.execute_one(
-            "SELECT * FROM user_storage WHERE user_id = ?",
-            (user_id,)
+        """Update the user's storage quota tracking with a single UPSERT."""
+        await self.db.execute_write(UPDATE_STORAGE_QUOTA_SQL, _quota_params(user_id, bytes_delta, count_delta))
+    
+    async def _reserve_storage_quota(self, user_id: int, bytes_delta: int, count_delta: int) -> bool:
+        """
+        Like _update_storage_quota, but the UPSERT only applies a growth that keeps the user
+        within MAX_USER_STORAGE, including the first insert for a user without a row yet.
+        Returns False (and changes nothing) when it wouldn't.
+        """
+        initial_bytes = max(0, bytes_delta)
+        row = await self.db.execute_write_returning(
+            """INSERT INTO user_storage (user_id, total_bytes_used, file_count)
+               SELECT ?, ?, ? WHERE ? <= ?
+               ON CONFLICT(user_id) DO UPDATE SET
+                   total_bytes_used = total_bytes_used + ?,
+                   file_count = file_count + ?,
+                   last_updated = CURRENT_TIMESTAMP
+               WHERE ? <= 0 OR total_bytes_used + ? <= ?
+               RETURNING total_bytes_used""",
+            (user_id, initial_bytes, max(0, count_delta), initial_bytes, self.MAX_USER_STORAGE,
+             bytes_delta, count_delta, bytes_delta, bytes_delta, self.MAX_USER_STORAGE)
         )
-        
-        if existing:
-            await self.db.execute_write(
-                """UPDATE user_storage 
-                   SET total_bytes_used = total_bytes_used + ?,
-                       file_count = file_count + ?,
-                       last_updated = CURRENT_TIMESTAMP
-                   WHERE user_id = ?""",
-                (bytes_delta, count_delta, user_id)
-            )
-        else:
-            await self.db.execute_write(
-                """INSERT INTO user_storage (user_id, total_bytes_used, file_count)
-                   VALUES (?, ?, ?)""",
-                (user_id, max(0, bytes_delta), max(0, count_delta))
-            )
+        return row is not None
     
     @staticmethod
-    def _format_size(size_bytes: int) -> str:
-        """Format bytes as human-readable string."""
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size_bytes < 1024:
-                return f"{size_bytes:.1f} {unit}"
-            size_bytes /= 1024
-        return f"{size_bytes:.1f} TB"
+    def _days_ago(days: int) -> str:
+        """
+        UTC timestamp `days` ago in CURRENT_TIMESTAMP's format. Stored timestamps use the
+        same fixed-width format, so they compare correctly as plain strings.
+        """
+        return (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
     INACTIVE_DAYS = 30  # Delete files after 30 days of no access
     ACTIVE_USER_THRESHOLD_DAYS = 7  # User is "active" if they accessed within 7 days
     
     async def update_last_accessed(self, user_id: int, filename: str):
-        """Update the last_accessed timestamp for a file."""
+        """
+        Record a file access. Timestamps are buffered and written in batches every
+        ACCESS_FLUSH_INTERVAL seconds (or once ACCESS_FLUSH_SIZE accesses are pending).
+        """
+        self._access_buffer[(user_id, filename)] = self._days_ago(0)
+        if len(self._access_buffer) >= self.ACCESS_FLUSH_SIZE:
+            await self._flush_access_logged()
+        elif self._access_flush_task is None or self._access_flush_task.done():
+            self._access_flush_task = asyncio.create_task(self._flush_access_later())
+    
+    async def _flush_access_later(self):
+        await asyncio.sleep(self.ACCESS_FLUSH_INTERVAL)
+        await self._flush_access_logged()
+    
+    async def _flush_access_logged(self):
+        """Flush from the access path, where a failure is logged and retried on the next flush."""
         try:
-            await self.db.execute_write(
+            await self.flush_access_times()
+        except Exception as e:
+            logger.error(f"Failed to update last_accessed: {e}")
+    
+    async def flush_access_times(self):
+        """
+        Write all buffered last_accessed timestamps in one transaction. On failure the
+        batch goes back into the buffer (keeping the newer timestamp) and the error is raised.
+        """
+        if not self._access_buffer:
+            return
+        pending, self._access_buffer = self._access_buffer, {}
+        try:
+            await self.db.execute_writemany(
                 """UPDATE user_files 
-                   SET last_accessed = CURRENT_TIMESTAMP
+                   SET last_accessed = ?
                    WHERE user_id = ? AND filename = ?""",
-                (user_id, filename)
+                [(accessed, user_id, filename) for (user_id, filename), accessed in pending.items()]
             )
-        except Exception as e:
-            logger.error(f"Failed to update last_accessed: {e}")
+        except BaseException:
+            for key, accessed in pending.items():
+                if accessed > self._access_buffer.get(key, ""):
+                    self._access_buffer[key] = accessed
+            raise
     
     async def get_stale_files(self, inactive_days: int = None) -> List[Dict[str, Any]]:
         """
@@ -219,19 +436,24 @@ class FileStorageRepository:
         """
         if inactive_days is None:
             inactive_days = self.INACTIVE_DAYS
+        await self.flush_access_times()
         return await self.db.execute_many(
-            """SELECT f.* FROM user_files f
-               WHERE datetime(f.last_accessed) < datetime('now', ? || ' days')
-               AND f.user_id NOT IN (
-                   SELECT DISTINCT user_id FROM user_files 
-                   WHERE datetime(last_accessed) > datetime('now', ? || ' days')
+            """WITH f AS (
+                   SELECT *, MAX(last_accessed) OVER (PARTITION BY user_id) AS user_last_accessed
+                   FROM user_files
                )
-               ORDER BY f.last_accessed ASC""",
-            (f"-{inactive_days}", f"-{self.ACTIVE_USER_THRESHOLD_DAYS}")
+               SELECT id, user_id, filename, original_filename, file_path, file_size, mime_type,
+                      description, created_at, updated_at, last_accessed, is_persistent
+               FROM f
+               WHERE last_accessed < ?
+               AND user_last_accessed <= ?
+               ORDER BY last_accessed ASC""",
+            (self._days_ago(inactive_days), self._days_ago(self.ACTIVE_USER_THRESHOLD_DAYS))
         )
     
     async def get_user_last_activity(self, user_id: int) -> Optional[str]:
         """Get the timestamp of user's most recent file access."""
+        await self.flush_access_times()
         result = await self.db.execute_one(
             """SELECT MAX(last_accessed) as last_activity 
                FROM user_files WHERE user_id = ?""",
@@ -239,42 +461,58 @@ class FileStorageRepository:
         )
         return result['last_activity'] if result else None
     
+    async def _delete_file_rows_async(self, file_ids: List[int]) -> list:
+        """_delete_file_rows through the public async API, one statement per call."""
+        deleted = []
+        async with self.db.transaction():
+            for start in range(0, len(file_ids), self.DELETE_CHUNK_SIZE):
+                chunk = file_ids[start:start + self.DELETE_CHUNK_SIZE]
+                deleted.extend(await self.db.execute_many_rows(_select_file_rows_sql(len(chunk)), tuple(chunk)))
+                await self.db.execute_write(_delete_file_rows_sql(len(chunk)), tuple(chunk))
+            await self.db.execute_writemany(UPDATE_STORAGE_QUOTA_SQL, _quota_refunds(deleted))
+        return deleted
+    
     async def cleanup_stale_files(self, inactive_days: int = None) -> Dict[str, Any]:
         """
         Delete files that haven't been accessed for too long (from inactive users).
         Returns cleanup statistics.
         """
-        from pathlib import Path
-        
         stale_files = await self.get_stale_files(inactive_days)
+        stale_ids = [f['id'] for f in stale_files]
         
-        deleted_count = 0
-        freed_bytes = 0
-        errors = []
+        # Remove every stale row and settle each user's quota in one transaction (and, where
+        # supported, one thread hop). Rows are re-read under the write lock so files deleted
+        # meanwhile aren't counted twice.
+        if RUN_SYNC_SUPPORTED:
+            deleted = await self.db.run_sync(
+                lambda conn: _delete_file_rows(conn, stale_ids, self.DELETE_CHUNK_SIZE)
+            )
+        else:
+            deleted = await self._delete_file_rows_async(stale_ids)
+        for file_info in deleted:
+            self._adjust_cached_usage(file_info['user_id'], -file_info['file_size'], -1)
         
-        for file_info in stale_files:
-            try:
-                user_id = file_info['user_id']
-                filename = file_info['filename']
-                file_path = Path(file_info['file_path'])
-                file_size = file_info['file_size']
-                success = await self.delete_file(user_id, filename)
-                if success:
-                    if file_path.exists():
-                        os.remove(file_path)
-                    
-                    deleted_count += 1
-                    freed_bytes += file_size
-                    logger.info(f"Cleaned up stale file: {filename} (user {user_id})")
-                    
-            except Exception as e:
-                errors.append(f"{file_info['filename']}: {e}")
-                logger.error(f"Cleanup error for {file_info['filename']}: {e}")
+        # File removal happens after commit, outside the write lock, a bounded number at a time
+        unlink_slots = asyncio.Semaphore(self.UNLINK_CONCURRENCY)
+        
+        async def unlink(file_info):
+            async with unlink_slots:
+                await asyncio.to_thread(_safe_unlink, file_info['file_path'])
+        
+        results = await asyncio.gather(*(unlink(f) for f in deleted), return_exceptions=True)
+        errors = []
+        for file_info, result in zip(deleted, results):
+            if isinstance(result, Exception):
+                errors.append(f"{file_info['filename']}: {result}")
+                logger.error(f"Cleanup error for {file_info['filename']}: {result}")
+            else:
+                logger.info(f"Cleaned up stale file: {file_info['filename']} (user {file_info['user_id']})")
         
+        freed_bytes = sum(f['file_size'] for f in deleted)
         return {
-            'deleted_count': deleted_count,
+            'deleted_count': len(deleted),
             'freed_bytes': freed_bytes,
-            'freed_formatted': self._format_size(freed_bytes),
+            'freed_formatted': format_size(freed_bytes),
             'errors': errors
         }
     
@@ -288,7 +526,7 @@ class FileStorageRepository:
         return {
             'file_count': len(stale_files),
             'total_bytes': total_bytes,
-            'total_formatted': self._format_size(total_bytes),
+            'total_formatted': format_size(total_bytes),
             'users_affected': users_affected,
             'files': [{'filename': f['filename'], 'user_id': f['user_id'], 
                        'last_accessed': f['last_accessed']} for f in stale_files[:20]]
@@ -1,26 +1,58 @@
-from typing import Any, Dict, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
 
 from db.connection import DatabaseConnection
 
 
 class GuildRepository:
+    """
+    Guild rows are read on nearly every interaction but change rarely, and only
+    through this repository, so reads are cached until the next write. Cached rows
+    are read-only mappings.
+    """
+
+    __slots__ = ('db', '_cache', '_configured_cache', '_generation')
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
+        self._cache: Dict[int, Optional[Mapping[str, Any]]] = {}
+        self._configured_cache: Optional[List[Mapping[str, Any]]] = None
+        # Bumped on every write so a read that raced with it isn't cached
+        self._generation = 0
+
+    def invalidate(self, guild_id: Optional[int] = None):
+        """Forget cached rows for a guild (or every guild)."""
+        self._generation += 1
+        if guild_id is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(guild_id, None)
+        self._configured_cache = None
 
-    async def get(self, guild_id: int) -> Optional[Dict[str, Any]]:
-        return await self.db.execute_one(
+    async def get(self, guild_id: int) -> Optional[Mapping[str, Any]]:
+        if guild_id in self._cache:
+            return self._cache[guild_id]
+        generation = self._generation
+        row = await self.db.execute_one(
             "SELECT * FROM guilds WHERE guild_id = ?", (guild_id,)
         )
+        row = MappingProxyType(row) if row else None
+        if generation == self._generation:
+            self._cache[guild_id] = row
+        return row
 
     async def create(self, guild_id: int, **kwargs):
         columns = ["guild_id"] + list(kwargs.keys())
         placeholders = ", ".join(["?" for _ in columns])
         values = [guild_id] + list(kwargs.values())
         
-        await self.db.execute_write(
-            f"INSERT INTO guilds ({', '.join(columns)}) VALUES ({placeholders})",
-            tuple(values)
-        )
+        try:
+            await self.db.execute_write(
+                f"INSERT INTO guilds ({', '.join(columns)}) VALUES ({placeholders})",
+                tuple(values)
+            )
+        finally:
+            self.invalidate(guild_id)
 
     async def update(self, guild_id: int, **kwargs):
         if not kwargs:
@@ -29,10 +61,13 @@ class GuildRepository:
         set_clause = ", ".join([f"{k} = ?" for k in kwargs.keys()])
         values = list(kwargs.values()) + [guild_id]
         
-        await self.db.execute_write(
-            f"UPDATE guilds SET {set_clause} WHERE guild_id = ?", 
-            tuple(values)
-        )
+        try:
+            await self.db.execute_write(
+                f"UPDATE guilds SET {set_clause} WHERE guild_id = ?", 
+                tuple(values)
+            )
+        finally:
+            self.invalidate(guild_id)
 
     async def create_or_update(self, guild_id: int, **kwargs):
         existing = await self.get(guild_id)
@@ -41,13 +76,23 @@ class GuildRepository:
         else:
             await self.create(guild_id, **kwargs)
 
-    async def get_all_configured(self):
-        return await self.db.execute_many(
-            "SELECT * FROM guilds WHERE configured = 1"
-        )
+    async def get_all_configured(self) -> List[Mapping[str, Any]]:
+        if self._configured_cache is None:
+            generation = self._generation
+            rows = await self.db.execute_many(
+                "SELECT * FROM guilds WHERE configured = 1"
+            )
+            rows = [MappingProxyType(row) for row in rows]
+            if generation != self._generation:
+                return rows
+            self._configured_cache = rows
+        return list(self._configured_cache)
 
     async def delete(self, guild_id: int):
-        await self.db.execute_write(
-            "DELETE FROM guilds WHERE guild_id = ?",
-            (guild_id,)
-        )
+        try:
+            await self.db.execute_write(
+                "DELETE FROM guilds WHERE guild_id = ?",
+                (guild_id,)
+            )
+        finally:
+            self.invalidate(guild_id)
@@ -1,7 +1,22 @@
+import re
+
 from ..connection import DatabaseConnection
 
+FTS_TOKEN_RE = re.compile(r"\w+")
+
+
+def _fts_prefix_query(search_term: str) -> str:
+    """
+    Turn free text into an FTS5 query that matches every word as a prefix
+    ("quran rev" -> "quran"* "rev"*). Words are quoted, so FTS syntax in the
+    input is never interpreted.
+    """
+    return " ".join(f'"{token}"*' for token in FTS_TOKEN_RE.findall(search_term))
+
 
 class MemoryRepository:
+    __slots__ = ('connection',)
+
     def __init__(self, connection: DatabaseConnection):
         self.connection = connection
 
@@ -11,12 +26,8 @@ class MemoryRepository:
         VALUES (?, ?, ?)
         """
         
-        await self.connection.execute_write(query, (user_id, guild_id, content))
-        row = await self.connection.execute_one(
-            "SELECT id FROM user_memories WHERE user_id = ? AND guild_id = ? ORDER BY id DESC LIMIT 1",
-            (user_id, guild_id)
-        )
-        return row
+        memory_id = await self.connection.execute_write(query, (user_id, guild_id, content))
+        return {'id': memory_id}
 
     async def get_memories(self, user_id: int, guild_id: int, limit: int = 10):
         query = """
@@ -30,14 +41,26 @@ class MemoryRepository:
         return rows
 
     async def search_memories(self, user_id: int, guild_id: int, search_term: str, limit: int = 5):
+        match_query = _fts_prefix_query(search_term)
+        if not match_query:
+            # No word characters (e.g. an emoji) -- FTS has nothing to index, so substring-match
+            query = """
+            SELECT id, content, created_at
+            FROM user_memories
+            WHERE user_id = ? AND guild_id = ? AND content LIKE ?
+            ORDER BY created_at DESC
+            LIMIT ?
+            """
+            return await self.connection.execute_many(query, (user_id, guild_id, f"%{search_term}%", limit))
         query = """
-        SELECT id, content, created_at
-        FROM user_memories
-        WHERE user_id = ? AND guild_id = ? AND content LIKE ?
-        ORDER BY created_at DESC
+        SELECT m.id, m.content, m.created_at
+        FROM user_memories_fts f
+        JOIN user_memories m ON m.id = f.rowid
+        WHERE user_memories_fts MATCH ? AND m.user_id = ? AND m.guild_id = ?
+        ORDER BY m.created_at DESC
         LIMIT ?
         """
-        return await self.connection.execute_many(query, (user_id, guild_id, f"%{search_term}%", limit))
+        return await self.connection.execute_many(query, (match_query, user_id, guild_id, limit))
 
     async def delete_memory(self, memory_id: int, user_id: int):
         query = """
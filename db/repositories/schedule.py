@@ -4,6 +4,8 @@ from db.connection import DatabaseConnection
 
 
 class ScheduleRepository:
+    __slots__ = ('db',)
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
 
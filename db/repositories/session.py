@@ -2,8 +2,51 @@ from typing import Any, Dict, List, Optional
 
 from db.connection import DatabaseConnection
 
+# Every daily_sessions column except message_ids, which no reader uses
+SESSION_COLUMNS = (
+    "id, guild_id, session_date, start_page, end_page, created_at, "
+    "is_completed, completed_at, summary_message_id"
+)
+
+# Built once at import rather than per call; sqlite3 keys its statement cache on this text
+SELECT_SESSION_BY_SUMMARY_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? AND summary_message_id = ?"
+)
+SELECT_TODAY_SESSION_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? AND session_date = ? ORDER BY created_at DESC LIMIT 1"
+)
+SELECT_CURRENT_SESSION_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? ORDER BY created_at DESC LIMIT 1"
+)
+SELECT_SESSION_BY_ID_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE id = ?"
+)
+SELECT_PREVIOUS_SESSION_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? AND created_at < (SELECT created_at FROM daily_sessions WHERE id = ?) "
+    "ORDER BY created_at DESC LIMIT 1"
+)
+SELECT_SESSION_FOR_PAGE_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? AND start_page <= ? AND end_page >= ? ORDER BY created_at DESC LIMIT 1"
+)
+SELECT_COMPLETED_SESSIONS_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? AND is_completed = 1 ORDER BY created_at ASC"
+)
+SELECT_ALL_SESSIONS_SQL = (
+    f"SELECT {SESSION_COLUMNS} FROM daily_sessions "
+    "WHERE guild_id = ? ORDER BY created_at ASC"
+)
+
 
 class SessionRepository:
+    __slots__ = ('db',)
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
 
@@ -23,12 +66,13 @@ class SessionRepository:
     async def get_session_by_summary_message_id(self, guild_id: int, message_id: int) -> Optional[Dict[str, Any]]:
         """Get session by its summary message ID."""
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions WHERE guild_id = ? AND summary_message_id = ?""",
+            SELECT_SESSION_BY_SUMMARY_SQL,
             (guild_id, message_id)
         )
 
-    async def create(self, guild_id: int, session_date: str, start_page: int, end_page: int, message_ids: str):
-        await self.db.execute_write(
+    async def create(self, guild_id: int, session_date: str, start_page: int, end_page: int, message_ids: str) -> int:
+        """Create a session and return its ID."""
+        return await self.db.execute_write(
             """INSERT INTO daily_sessions (guild_id, session_date, start_page, end_page, message_ids)
                VALUES (?, ?, ?, ?, ?)""",
             (guild_id, session_date, start_page, end_page, message_ids)
@@ -36,50 +80,36 @@ class SessionRepository:
 
     async def get_today(self, guild_id: int, session_date: str) -> Optional[Dict[str, Any]]:
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ? AND session_date = ?
-               ORDER BY created_at DESC LIMIT 1""",
+            SELECT_TODAY_SESSION_SQL,
             (guild_id, session_date)
         )
 
     async def get_current_active_session(self, guild_id: int) -> Optional[Dict[str, Any]]:
         """Get the most recent session for this guild (the current active one)."""
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ?
-               ORDER BY created_at DESC LIMIT 1""",
+            SELECT_CURRENT_SESSION_SQL,
             (guild_id,)
         )
     
     async def get_session_by_id(self, session_id: int) -> Optional[Dict[str, Any]]:
         """Get a specific session by its ID."""
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions WHERE id = ?""",
+            SELECT_SESSION_BY_ID_SQL,
             (session_id,)
         )
 
     async def get_previous_session(self, guild_id: int, current_session_id: int) -> Optional[Dict[str, Any]]:
         """Get the session immediately preceding the current one."""
-        current = await self.get_session_by_id(current_session_id)
-        if not current:
-            return None
-            
+        # An unknown current_session_id makes the subquery NULL, so nothing matches
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ? AND created_at < ?
-               ORDER BY created_at DESC LIMIT 1""",
-            (guild_id, current['created_at'])
+            SELECT_PREVIOUS_SESSION_SQL,
+            (guild_id, current_session_id)
         )
 
-
     async def get_session_for_page(self, guild_id: int, page_number: int) -> Optional[Dict[str, Any]]:
         """Find which session a specific page belongs to."""
         return await self.db.execute_one(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ? 
-               AND start_page <= ? 
-               AND end_page >= ?
-               ORDER BY created_at DESC LIMIT 1""",
+            SELECT_SESSION_FOR_PAGE_SQL,
             (guild_id, page_number, page_number)
         )
 
@@ -95,18 +125,14 @@ class SessionRepository:
     async def get_completed_sessions_for_guild(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get all completed sessions for a guild, ordered by creation date."""
         return await self.db.execute_many(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ? AND is_completed = 1
-               ORDER BY created_at ASC""",
+            SELECT_COMPLETED_SESSIONS_SQL,
             (guild_id,)
         )
 
     async def get_all_sessions_for_guild(self, guild_id: int) -> List[Dict[str, Any]]:
         """Get all sessions for a guild, ordered by creation date."""
         return await self.db.execute_many(
-            """SELECT * FROM daily_sessions 
-               WHERE guild_id = ?
-               ORDER BY created_at ASC""",
+            SELECT_ALL_SESSIONS_SQL,
             (guild_id,)
         )
 
@@ -1,26 +1,92 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Any, AsyncIterator, Dict, List, Mapping, Optional, Tuple
 
 from db.connection import DatabaseConnection
 
+# (user_id, guild_id) rows kept in memory; least recently used are dropped first
+USER_CACHE_SIZE = 2048
+
 
 class UserRepository:
+    """
+    User rows are only written through this repository, so `get` serves them from an
+    LRU cache that every write invalidates. Cached rows are read-only mappings.
+    Concurrent misses for the same user share a single query.
+    """
+
+    __slots__ = ('db', '_cache', '_generation', '_inflight')
+
     def __init__(self, db: DatabaseConnection):
         self.db = db
-
-    async def get(self, user_id: int, guild_id: int) -> Optional[Dict[str, Any]]:
-        return await self.db.execute_one(
-            "SELECT * FROM users WHERE user_id = ? AND guild_id = ?",
-            (user_id, guild_id)
-        )
+        self._cache: OrderedDict[Tuple[int, int], Optional[Mapping[str, Any]]] = OrderedDict()
+        # Bumped on every write so a read that raced with it isn't cached
+        self._generation = 0
+        # (user_id, guild_id) -> task fetching that row, awaited by every concurrent miss
+        self._inflight: Dict[Tuple[int, int], asyncio.Task] = {}
+
+    def invalidate(self, user_id: Optional[int] = None, guild_id: Optional[int] = None):
+        """Forget a cached user, every user of a guild (user_id=None), or everything."""
+        self._generation += 1
+        # In-flight reads may predate the write, so later callers must not join them
+        if user_id is not None and guild_id is not None:
+            self._cache.pop((user_id, guild_id), None)
+            self._inflight.pop((user_id, guild_id), None)
+        elif guild_id is not None:
+            for cache in (self._cache, self._inflight):
+                for key in [key for key in cache if key[1] == guild_id]:
+                    del cache[key]
+        else:
+            self._cache.clear()
+            self._inflight.clear()
+
+    async def get(self, user_id: int, guild_id: int) -> Optional[Mapping[str, Any]]:
+        key = (user_id, guild_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key))
+            self._inflight[key] = task
+        # Shielded so one cancelled caller doesn't cancel the query for the others
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: Tuple[int, int]) -> Optional[Mapping[str, Any]]:
+        generation = self._generation
+        try:
+            row = await self.db.execute_one(
+                "SELECT * FROM users WHERE user_id = ? AND guild_id = ?",
+                key
+            )
+        finally:
+            if self._inflight.get(key) is asyncio.current_task():
+                del self._inflight[key]
+        row = MappingProxyType(row) if row else None
+        if generation == self._generation:
+            self._cache[key] = row
+            if len(self._cache) > USER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return row
+
+    async def _write_user(self, user_id: int, guild_id: int, query: str, params: tuple):
+        """Run a write that touches one user's row, then drop that row from the cache."""
+        try:
+            await self.db.execute_write(query, params)
+        finally:
+            self.invalidate(user_id, guild_id)
 
     async def register(self, user_id: int, guild_id: int):
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             "INSERT OR REPLACE INTO users (user_id, guild_id, registered) VALUES (?, ?, 1)",
             (user_id, guild_id)
         )
 
     async def unregister(self, user_id: int, guild_id: int):
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             "UPDATE users SET registered = 0 WHERE user_id = ? AND guild_id = ?",
             (user_id, guild_id)
         )
@@ -31,90 +97,122 @@ class UserRepository:
             (guild_id,)
         )
 
+    async def iter_registered(self, guild_id: int, page_size: int = 500) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yield a guild's registered users in user_id order, `page_size` rows at a time.
+        Pages are keyed on user_id, which idx_users_guild_registered_user walks in order.
+        """
+        last_user_id = -1
+        while True:
+            rows = await self.db.execute_many(
+                """SELECT * FROM users
+                   WHERE guild_id = ? AND registered = 1 AND user_id > ?
+                   ORDER BY user_id LIMIT ?""",
+                (guild_id, last_user_id, page_size)
+            )
+            for row in rows:
+                yield row
+            if len(rows) < page_size:
+                return
+            last_user_id = rows[-1]['user_id']
+
     async def update_streak(self, user_id: int, guild_id: int, new_streak: int, last_completion: str):
-        user = await self.get(user_id, guild_id)
-        if not user:
-            return
-        
-        longest = max(user['longest_streak'], new_streak)
-        await self.db.execute_write(
+        # No-op when the user row doesn't exist
+        await self._write_user(
+            user_id, guild_id,
             """UPDATE users 
-               SET current_streak = ?, longest_streak = ?, last_completion_date = ?
+               SET current_streak = ?, longest_streak = MAX(longest_streak, ?), last_completion_date = ?
                WHERE user_id = ? AND guild_id = ?""",
-            (new_streak, longest, last_completion, user_id, guild_id)
+            (new_streak, new_streak, last_completion, user_id, guild_id)
         )
 
     async def update_session_streak(self, user_id: int, guild_id: int, new_streak: int):
         """Update the session-based streak for a user."""
-        user = await self.get(user_id, guild_id)
-        if not user:
-            return
-        
-        longest = max(user.get('longest_session_streak', 0), new_streak)
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             """UPDATE users 
-               SET session_streak = ?, longest_session_streak = ?
+               SET session_streak = ?, longest_session_streak = MAX(longest_session_streak, ?)
                WHERE user_id = ? AND guild_id = ?""",
-            (new_streak, longest, user_id, guild_id)
+            (new_streak, new_streak, user_id, guild_id)
         )
 
     async def set_session_streak(self, user_id: int, guild_id: int, streak: int):
-        """Manually set a user's session streak (admin command)."""
-        user = await self.get(user_id, guild_id)
-        if not user:
-            await self.register(user_id, guild_id)
-        current_longest = user.get('longest_session_streak', 0) if user else 0
-        longest = max(current_longest, streak)
-        
-        await self.db.execute_write(
-            """UPDATE users 
-               SET session_streak = ?, longest_session_streak = ?
-               WHERE user_id = ? AND guild_id = ?""",
-            (streak, longest, user_id, guild_id)
+        """Manually set a user's session streak (admin command), registering them if they have no row."""
+        await self._write_user(
+            user_id, guild_id,
+            """INSERT INTO users (user_id, guild_id, registered, session_streak, longest_session_streak)
+               VALUES (?, ?, 1, ?, ?)
+               ON CONFLICT(user_id, guild_id) DO UPDATE SET
+                   session_streak = excluded.session_streak,
+                   longest_session_streak = MAX(longest_session_streak, excluded.session_streak)""",
+            (user_id, guild_id, streak, streak)
         )
 
     async def get_user_session_completions(self, user_id: int, guild_id: int) -> Dict[int, bool]:
         """Get dict of {session_id: is_late} for fully completed sessions."""
-        rows = await self.db.execute_many(
-            """SELECT c.session_id, MAX(c.is_late) as is_late
-               FROM completions c
-               JOIN daily_sessions ds ON c.session_id = ds.id
-               WHERE c.user_id = ? AND c.guild_id = ?
-               GROUP BY c.session_id
-               HAVING COUNT(DISTINCT c.page_number) = (ds.end_page - ds.start_page + 1)""",
+        # Aggregate the user's completions first, then join each session once
+        rows = await self.db.execute_many_rows(
+            """WITH agg AS (
+                   SELECT session_id, COUNT(DISTINCT page_number) AS pages, MAX(is_late) AS is_late
+                   FROM completions
+                   WHERE user_id = ? AND guild_id = ? AND session_id IS NOT NULL
+                   GROUP BY session_id
+               )
+               SELECT a.session_id, a.is_late
+               FROM agg a
+               JOIN daily_sessions ds ON ds.id = a.session_id
+               WHERE a.pages = ds.end_page - ds.start_page + 1""",
             (user_id, guild_id)
         )
-        return {row['session_id']: bool(row['is_late']) for row in rows}
+        return {session_id: bool(is_late) for session_id, is_late in rows}
 
 
     async def clear_all(self, guild_id: int):
-        await self.db.execute_write(
-            "DELETE FROM users WHERE guild_id = ?",
-            (guild_id,)
-        )
+        try:
+            await self.db.execute_write(
+                "DELETE FROM users WHERE guild_id = ?",
+                (guild_id,)
+            )
+        finally:
+            self.invalidate(guild_id=guild_id)
 
     async def get_language_preference(self, user_id: int, guild_id: int) -> str:
-        user = await self.get(user_id, guild_id)
-        return user.get('language_preference', 'eng') if user else 'eng'
+        # A cached row answers without a query; otherwise read just the one column.
+        # A missing row or a NULL column both fall back to the default.
+        row = self._cache.get((user_id, guild_id))
+        if row is not None:
+            return row['language_preference'] or 'eng'
+        return await self.db.execute_scalar(
+            "SELECT language_preference FROM users WHERE user_id = ? AND guild_id = ?",
+            (user_id, guild_id)
+        ) or 'eng'
 
     async def set_language_preference(self, user_id: int, guild_id: int, language: str):
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             "UPDATE users SET language_preference = ? WHERE user_id = ? AND guild_id = ?",
             (language, user_id, guild_id)
         )
 
     async def get_tafsir_preference(self, user_id: int, guild_id: int) -> str:
-        user = await self.get(user_id, guild_id)
-        return user.get('tafsir_preference', 'ar-tafsir-ibn-kathir') if user else 'ar-tafsir-ibn-kathir'
+        row = self._cache.get((user_id, guild_id))
+        if row is not None:
+            return row['tafsir_preference'] or 'ar-tafsir-ibn-kathir'
+        return await self.db.execute_scalar(
+            "SELECT tafsir_preference FROM users WHERE user_id = ? AND guild_id = ?",
+            (user_id, guild_id)
+        ) or 'ar-tafsir-ibn-kathir'
 
     async def set_tafsir_preference(self, user_id: int, guild_id: int, tafsir: str):
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             "UPDATE users SET tafsir_preference = ? WHERE user_id = ? AND guild_id = ?",
             (tafsir, user_id, guild_id)
         )
 
     async def set_streak_emoji(self, user_id: int, guild_id: int, emoji: str):
-        await self.db.execute_write(
+        await self._write_user(
+            user_id, guild_id,
             "UPDATE users SET streak_emoji = ? WHERE user_id = ? AND guild_id = ?",
             (emoji, user_id, guild_id)
         )
@@ -1,4 +1,5 @@
 import logging
+import os
 from pathlib import Path
 
 import nextcord as discord
@@ -6,6 +7,8 @@ from nextcord.ext import commands
 
 from config import DEBUG_GUILD_IDS, DEBUG_MODE, DISCORD_TOKEN, OWNER_IDS
 from database import db
+from utils.completion import handle_completion
+from utils.interaction_handlers import handle_tafsir, handle_translation
 
 logging.basicConfig(
     level=logging.INFO,
@@ -16,7 +19,27 @@ logger = logging.getLogger(__name__)
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(intents=intents, command_prefix="!", owner_ids=OWNER_IDS)
+
+
+class WirdBot(commands.Bot):
+    async def close(self):
+        # Gateway disconnects are routine (most resume without on_ready), so the
+        # database stays open until the bot itself shuts down
+        await super().close()
+        await db.close()
+
+
+bot = WirdBot(intents=intents, command_prefix="!", owner_ids=OWNER_IDS)
+
+# Persistent page buttons, keyed by the custom_id prefix before "_<page>"
+BUTTON_HANDLERS = {
+    'complete': handle_completion,
+    'translate': handle_translation,
+    'tafsir': handle_tafsir,
+}
+# Prefixes views also use for their own ids (tafsir_select_*, tafsir_prev_*, ...),
+# so a non-numeric page under them is passed on rather than treated as malformed
+VIEW_SHARED_PREFIXES = frozenset({'tafsir'})
 
 if DEBUG_MODE:
     logger.info(f"🐛 DEBUG MODE ENABLED - Commands will register instantly to guilds {DEBUG_GUILD_IDS}")
@@ -26,7 +49,8 @@ else:
 
 @bot.event
 async def on_ready():
-    await db.connect()
+    if not db.connection.is_connected:
+        await db.connect()
     logger.info(f"✅ {bot.user} is ready!")
     logger.info(f"Logged in as {bot.user.name} ({bot.user.id})")
 
@@ -35,103 +59,94 @@ async def on_ready():
 async def on_interaction(interaction: discord.Interaction):
     if interaction.type == discord.InteractionType.component:
         custom_id = interaction.data.get('custom_id', '')
-        if custom_id.startswith('complete_'):
+        prefix, _, rest = custom_id.partition('_')
+        # The page is the second "_" field; anything after it is ignored, as before
+        page = rest.partition('_')[0]
+        handler = BUTTON_HANDLERS.get(prefix)
+        if handler:
             try:
-                page_number = int(custom_id.split('_')[1])
-                from utils.completion import handle_completion
-                await handle_completion(interaction, page_number)
-                return  # Handled
-            except (ValueError, IndexError):
-                logger.warning(f"Invalid completion button custom_id: {custom_id}")
+                page_number = int(page)
+            except ValueError:
+                page_number = None
+            if page_number is not None:
+                try:
+                    await handler(interaction, page_number)
+                except Exception as e:
+                    logger.error(f"Error handling {prefix} button {custom_id}: {e}")
                 return
-        elif custom_id.startswith('translate_'):
-            try:
-                page_number = int(custom_id.split('_')[1])
-                from utils.interaction_handlers import handle_translation
-                await handle_translation(interaction, page_number)
-                return  # Handled
-            except (ValueError, IndexError):
-                logger.warning(f"Invalid translation button custom_id: {custom_id}")
+            if prefix not in VIEW_SHARED_PREFIXES:
+                logger.warning(f"Invalid {prefix} button custom_id: {custom_id}")
                 return
-        elif custom_id.startswith('tafsir_'):
-            parts = custom_id.split('_')
-            if len(parts) >= 2 and parts[1].isdigit():
-                try:
-                    page_number = int(parts[1])
-                    from utils.interaction_handlers import handle_tafsir
-                    await handle_tafsir(interaction, page_number)
-                    return  # Handled
-                except (ValueError, IndexError):
-                    logger.warning(f"Invalid tafsir button custom_id: {custom_id}")
-                    return
     try:
         await bot.process_application_commands(interaction)
     except Exception as e:
         logger.error(f"Error processing interaction: {e}")
 
 
-@bot.event
-async def on_disconnect():
-    await db.close()
+# Static, and sending doesn't modify it, so one instance serves every join
+WELCOME_EMBED = discord.Embed(
+    title="📖 Welcome to Wird Bot!",
+    description="Thank you for adding me to your server! I help manage daily Quran reading (Wird) with tracking and streaks.",
+    color=discord.Color.green()
+)
+WELCOME_EMBED.add_field(
+    name="🚀 Quick Setup",
+    value="Run `/setup` to configure the bot with an interactive wizard.\n\n**Required Permission:** Manage Channels",
+    inline=False
+)
+WELCOME_EMBED.set_footer(text="Run /setup to get started!")
 
 
 @bot.event
 async def on_guild_join(guild: discord.Guild):
     logger.info(f"Joined new guild: {guild.name} ({guild.id})")
-    
-    embed = discord.Embed(
-        title="📖 Welcome to Wird Bot!",
-        description="Thank you for adding me to your server! I help manage daily Quran reading (Wird) with tracking and streaks.",
-        color=discord.Color.green()
-    )
-    
-    embed.add_field(
-        name="🚀 Quick Setup",
-        value="Run `/setup` to configure the bot with an interactive wizard.\n\n**Required Permission:** Manage Channels",
-        inline=False
-    )
-    
-    embed.set_footer(text="Run /setup to get started!")
     target_channel = guild.system_channel
     if not target_channel:
-        for channel in guild.text_channels:
-            if channel.permissions_for(guild.me).send_messages:
-                target_channel = channel
-                break
+        me = guild.me
+        if me.guild_permissions.administrator:
+            # Administrators bypass every channel overwrite, so any channel will do
+            target_channel = next(iter(guild.text_channels), None)
+        else:
+            target_channel = next(
+                (channel for channel in guild.text_channels if channel.permissions_for(me).send_messages),
+                None
+            )
     
     if target_channel:
         try:
-            await target_channel.send(embed=embed)
+            await target_channel.send(embed=WELCOME_EMBED)
         except discord.Forbidden:
             logger.warning(f"Cannot send welcome message to {guild.name} - no permissions")
     else:
         logger.warning(f"No suitable channel found in {guild.name} for welcome message")
 
 
+def _discover_cogs(cogs_dir: Path) -> list:
+    """Extension names under cogs/, found in one directory scan: modules first, then packages."""
+    modules, packages = [], []
+    with os.scandir(cogs_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith("_"):
+                continue
+            if entry.is_dir():
+                if os.path.exists(os.path.join(entry.path, "__init__.py")):
+                    packages.append(f"cogs.{entry.name}")
+            elif entry.name.endswith(".py"):
+                modules.append(f"cogs.{entry.name[:-3]}")
+    return sorted(modules) + sorted(packages)
+
+
 def load_extensions():
     bot.load_extension('onami')
-    cogs_dir = Path(__file__).parent / "cogs"
-    for cog_file in cogs_dir.glob("*.py"):
-        if cog_file.stem.startswith("_"):
-            continue
-        
-        cog_name = f"cogs.{cog_file.stem}"
+    failures = []
+    for cog_name in _discover_cogs(Path(__file__).parent / "cogs"):
         try:
             bot.load_extension(cog_name)
             logger.info(f"Loaded extension: {cog_name}")
         except Exception as e:
-            logger.error(f"Failed to load extension {cog_name}: {e}")
-    for cog_dir in cogs_dir.iterdir():
-        if cog_dir.is_dir() and not cog_dir.stem.startswith("_"):
-            init_file = cog_dir / "__init__.py"
-            if init_file.exists():
-                cog_name = f"cogs.{cog_dir.stem}"
-                try:
-                    bot.load_extension(cog_name)
-                    logger.info(f"Loaded extension: {cog_name}")
-                except Exception as e:
-                    logger.error(f"Failed to load extension {cog_name}: {e}")
-
+            failures.append(f"{cog_name}: {e}")
+    if failures:
+        logger.error("Failed to load extensions:\n" + "\n".join(failures))
 
 if __name__ == "__main__":
     load_extensions()
@@ -0,0 +1,9 @@
+-- Migration 017: Index tuning for hot read paths
+
+-- The UNIQUE(page_number, language|edition) constraints already create the lookup
+-- indexes for the cache tables, so these duplicates only cost extra writes.
+DROP INDEX IF EXISTS idx_translation_cache_lookup;
+DROP INDEX IF EXISTS idx_tafsir_cache_lookup;
+
+-- Covering index for per-guild, per-date completion listings
+CREATE INDEX IF NOT EXISTS idx_completions_guild_date ON completions(guild_id, completion_date, user_id, page_number, is_late);
@@ -0,0 +1,6 @@
+-- Migration 018: Covering index for per-user session completion checks
+
+-- Serves the COUNT(DISTINCT page_number)/MAX(is_late) lookup by (session_id, user_id)
+-- without touching the table. It also covers everything idx_completions_session did.
+CREATE INDEX IF NOT EXISTS idx_completions_session_user_page ON completions(session_id, user_id, page_number, is_late);
+DROP INDEX IF EXISTS idx_completions_session;
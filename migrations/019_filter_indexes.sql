@@ -0,0 +1,13 @@
+-- Migration 019: Indexes matching the remaining hot filters
+
+-- idx_completions_user_guild_date (001) already serves the per-user date lookup.
+
+-- Late-completion listings only ever ask for is_late = 1 rows
+CREATE INDEX IF NOT EXISTS idx_completions_guild_date_late ON completions(guild_id, completion_date, user_id) WHERE is_late = 1;
+
+-- Campaign responses listed newest first
+CREATE INDEX IF NOT EXISTS idx_campaign_responses_campaign_submitted ON campaign_responses(campaign_id, submitted_at DESC);
+
+-- Campaign listings filtered by status; guild_id is its leading column, so it replaces idx_campaigns_guild
+CREATE INDEX IF NOT EXISTS idx_campaigns_guild_status_created ON campaigns(guild_id, status, created_at DESC);
+DROP INDEX IF EXISTS idx_campaigns_guild;
@@ -0,0 +1,16 @@
+-- Migration 020: Indexes for the remaining repository lookups
+
+-- Current/most recent session per guild (ORDER BY created_at DESC LIMIT 1), also
+-- walked newest-first by the page-range lookup
+CREATE INDEX IF NOT EXISTS idx_daily_sessions_guild_created ON daily_sessions(guild_id, created_at);
+
+-- Summary message lookups; most rows have no summary message yet
+CREATE INDEX IF NOT EXISTS idx_daily_sessions_guild_summary ON daily_sessions(guild_id, summary_message_id) WHERE summary_message_id IS NOT NULL;
+
+-- Memories are listed newest first per user and guild
+CREATE INDEX IF NOT EXISTS idx_user_memories_user_guild_created ON user_memories(user_id, guild_id, created_at DESC);
+
+-- Duplicates: idx_daily_sessions_guild_date has the same columns, and the
+-- UNIQUE(user_id, filename) / (user_id, last_accessed) indexes both lead with user_id
+DROP INDEX IF EXISTS idx_sessions_guild_date;
+DROP INDEX IF EXISTS idx_user_files_user_id;
@@ -0,0 +1,25 @@
+-- Migration 021: Full-text index over memory content
+
+CREATE VIRTUAL TABLE IF NOT EXISTS user_memories_fts USING fts5(
+    content,
+    content='user_memories',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+-- Keep the external-content index in step with user_memories
+CREATE TRIGGER IF NOT EXISTS user_memories_fts_insert AFTER INSERT ON user_memories BEGIN
+    INSERT INTO user_memories_fts(rowid, content) VALUES (new.id, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_memories_fts_delete AFTER DELETE ON user_memories BEGIN
+    INSERT INTO user_memories_fts(user_memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_memories_fts_update AFTER UPDATE OF content ON user_memories BEGIN
+    INSERT INTO user_memories_fts(user_memories_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    INSERT INTO user_memories_fts(rowid, content) VALUES (new.id, new.content);
+END;
+
+-- Index the memories saved before this migration
+INSERT INTO user_memories_fts(user_memories_fts) VALUES ('rebuild');
@@ -0,0 +1,6 @@
+-- Migration 022: Registered users per guild
+
+-- get_all_registered and iter_registered filter on registered = 1; the partial
+-- index leaves unregistered members out, and user_id keeps it in the order
+-- iter_registered pages through. idx_users_guild stays for the guild-wide DELETE on reset.
+CREATE INDEX IF NOT EXISTS idx_users_guild_registered_user ON users(guild_id, user_id) WHERE registered = 1;
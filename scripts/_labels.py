@@ -0,0 +1,91 @@
+"""
+_labels.py
+==========
+Shared _TOOL_LABELS template used by apply_emojis.py and upload_emojis.py.
+"""
+
+# (tool, icon, in-progress label, done label); a bare string is a section comment.
+TOOL_LABEL_ROWS = (
+    "Web",
+    ("search_web",           "Web", "Searching web for **{query}**",            "Searched web for [{query}](<https://duckduckgo.com/?q={query_encoded}>)"),
+    ("read_url",             "Web", "Reading `{url}`",                          "Read [{url_short}]({url})"),
+    ("search_in_url",        "Web", "Searching `{url}` for **{search_term}**",  "Searched [{url_short}]({url}) for **{search_term}**"),
+    ("extract_links",        "Web", "Extracting links from `{url}`",            "Extracted links from [{url_short}]({url})"),
+    ("get_page_headings",    "Web", "Getting headings from `{url}`",            "Got headings from [{url_short}]({url})"),
+    "Quran / Lookup",
+    ("lookup_quran_page",    "Lookup", "Looking up Quran page {page}",      "Looked up Quran page {page}"),
+    ("lookup_tafsir",        "Lookup", "Looking up tafsir for {ayah}",      "Looked up tafsir for {ayah}"),
+    ("show_quran_page",      "Lookup", "Fetching Quran page image",         "Fetched Quran page image"),
+    ("get_ayah_safe",        "Lookup", "Getting ayah {surah}:{ayah}",       "Got ayah {surah}:{ayah}"),
+    ("get_page_safe",        "Lookup", "Getting Quran page {page}",         "Got Quran page {page}"),
+    ("search_quran_safe",    "Lookup", "Searching Quran for **{query}**",   "Searched Quran for **{query}**"),
+    "Admin / DB",
+    ("execute_sql",          "Database", "Searching database",                  "Searched database"),
+    ("get_db_schema",        "Database", "Fetching database schema",            "Fetched database schema"),
+    ("search_codebase",      "Lookup",   "Searching codebase for **{query}**",  "Searched codebase for **{query}**"),
+    ("read_file",            "Folder",   "Reading `{filename}`",                "Read `{filename}`"),
+    ("update_server_config", "Edit",     "Updating `{setting}` \u2192 `{value}`", "Updated `{setting}` \u2192 `{value}`"),
+    "User",
+    ("get_my_stats",         "Lookup", "Fetching your stats",               "Fetched your stats"),
+    ("set_my_streak_emoji",  "Edit",   "Setting streak emoji to {emoji}",   "Set streak emoji to {emoji}"),
+    "Discord info",
+    ("get_server_info",      "Lookup", "Fetching server info",              "Fetched server info"),
+    ("get_member_info",      "Lookup", "Fetching member info",              "Fetched member info"),
+    ("get_channel_info",     "Lookup", "Fetching channel info",             "Fetched channel info"),
+    ("get_role_info",        "Lookup", "Fetching role info",                "Fetched role info"),
+    ("get_channels",         "Lookup", "Listing channels",                  "Listed channels"),
+    ("check_permissions",    "Lookup", "Checking permissions",              "Checked permissions"),
+    "Discord actions",
+    ("execute_discord_code", "Edit", "Preparing code execution",            "Code execution prepared"),
+    "User space / files",
+    ("save_to_space",        "Folder", "Saving `{filename}` to your space",     "Saved `{filename}` to your space"),
+    ("read_from_space",      "Folder", "Reading `{filename}` from your space",  "Read `{filename}` from your space"),
+    ("list_space",           "Folder", "Listing your space",                    "Listed your space"),
+    ("get_space_info",       "Folder", "Getting space info",                    "Got space info"),
+    ("delete_from_space",    "Folder", "Deleting `{filename}` from your space", "Deleted `{filename}` from your space"),
+    ("zip_files",            "Folder", "Zipping files",                         "Zipped files"),
+    ("unzip_file",           "Folder", "Unzipping `{filename}`",                "Unzipped `{filename}`"),
+    ("share_file",           "Folder", "Sharing `{filename}`",                  "Shared `{filename}`"),
+    ("upload_attachment_to_space", "Folder", "Uploading attachment to your space", "Uploaded attachment to your space"),
+    ("save_message_attachments",   "Folder", "Saving message attachments",         "Saved message attachments"),
+    ("extract_pdf_images",   "Image", "Extracting PDF images from `{filename}`", "Extracted PDF images from `{filename}`"),
+    ("analyze_image",        "Image", "Analyzing image",                         "Analyzed image"),
+    "Bot management",
+    ("force_bot_status",     "Edit", "Setting bot status to **{status}**",  "Set bot status to **{status}**"),
+    ("add_bot_status_option", "Edit", "Adding status option",               "Added status option"),
+    "Campaign",
+    ("create_campaign_tool", "Edit",   "Creating campaign",                 "Created campaign"),
+    ("send_campaign",        "Edit",   "Sending campaign",                  "Sent campaign"),
+    ("list_campaigns",       "Lookup", "Listing campaigns",                 "Listed campaigns"),
+    ("get_campaign_responses", "Lookup", "Fetching campaign responses",     "Fetched campaign responses"),
+    ("add_campaign_button",  "Edit",   "Adding campaign button",            "Added campaign button"),
+    "CloudConvert",
+    ("convert_file",         "Folder", "Converting file",                   "Converted file"),
+    ("check_cloudconvert_status", "Lookup", "Checking conversion status",   "Checked conversion status"),
+    "Memory",
+    ("remember_info",        "Brain", "Saving to memory",                   "Saved to memory"),
+    ("get_my_memories",      "Brain", "Recalling memories",                 "Recalled memories"),
+    ("forget_memory",        "Brain", "Deleting memory",                    "Deleted memory"),
+    "Sandbox",
+    ("run_python_script",    "Python", "Running Python script",             "Ran Python script"),
+)
+
+
+def build_labels(R: dict) -> str:
+    """Return the full _TOOL_LABELS block as a string."""
+    icons = {
+        name: (R[name]["anim_str"], R[name]["ok_str"], R[name]["err_str"])
+        for name in {row[1] for row in TOOL_LABEL_ROWS if not isinstance(row, str)}
+    }
+
+    parts = ["_TOOL_LABELS = {"]
+    for row in TOOL_LABEL_ROWS:
+        if isinstance(row, str):
+            parts.append(f"    # {row}")
+            continue
+        key, icon, active, done = row
+        anim, ok, err = icons[icon]
+        label = f"'{key}':"
+        parts.append(f"    {label:<23} ('{anim}', '{active}', '{done}', '{ok}', '{err}'),")
+    parts.append("}")
+    return "\n".join(parts)
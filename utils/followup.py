@@ -30,9 +30,6 @@ async def send_followup_message(guild_id: int, bot, session_id: int = None):
         from datetime import datetime
         today = datetime.utcnow().strftime("%Y-%m-%d")
 
-        registered_users = await db.get_registered_users(guild_id)
-
-
         if session_id:
             session = await db.get_session_by_id(session_id)
         else:
@@ -50,16 +47,16 @@ async def send_followup_message(guild_id: int, bot, session_id: int = None):
 
 
         late_user_ids = await db.get_late_completions_for_session(session['id'])
+        completion_counts = await db.get_completion_counts_for_session(session['id'])
 
-        for user in registered_users:
+        async for user in db.users.iter_registered(guild_id):
             user_id = user['user_id']
 
-            user_completions = await db.get_user_completions_for_session(user_id, session['id'])
             member = guild.get_member(user_id)
             if not member:
                 continue
             
-            count = len(user_completions)
+            count = completion_counts.get(user_id, 0)
             
             if count == 0:
                 not_started.append(f"• {member.display_name}")
@@ -0,0 +1,8 @@
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+
+def format_size(size_bytes: int) -> str:
+    """Format bytes as human-readable string."""
+    # Each unit is 2**10 times the previous, so the bit length picks it directly
+    index = min(max(0, (int(size_bytes).bit_length() - 1) // 10), len(SIZE_UNITS) - 1)
+    return f"{size_bytes / (1 << (index * 10)):.1f} {SIZE_UNITS[index]}"
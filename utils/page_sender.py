@@ -68,13 +68,13 @@ async def send_daily_pages(guild_id: int, bot) -> bool:
         new_page = new_page - MAX_PAGES
     
     await db.create_or_update_guild(guild_id, current_page=new_page)
-    await db.create_daily_session(
+    session_id = await db.create_daily_session(
         guild_id, today, current_page, current_page + pages_per_day - 1, ",".join(message_ids)
     )
     
     if guild_config['followup_after_send']:
         await asyncio.sleep(2)
         from .followup import send_followup_message
-        await send_followup_message(guild_id, bot)
+        await send_followup_message(guild_id, bot, session_id=session_id)
     
     return True
\ No newline at end of file